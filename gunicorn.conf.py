@@ -0,0 +1,234 @@
+"""
+Gunicorn configuration for production (picked up by the Procfile).
+
+Every setting can be overridden from the environment. By default:
+
+- workers: 2 x CPUs + 1, capped by how many fit in the memory limit at
+  ``GUNICORN_WORKER_MEMORY_MB`` each (``WEB_CONCURRENCY`` or
+  ``GUNICORN_WORKERS`` override the count outright)
+- gthread workers with ``GUNICORN_THREADS`` threads each, so a slow
+  client or Cloudinary round trip doesn't tie up a whole process
+  (``GUNICORN_WORKER_CLASS=uvicorn`` switches to the ASGI app)
+- ``preload_app``: Django is imported once in the master and forked,
+  so workers share that memory copy-on-write and start in milliseconds
+- workers are recycled after ``GUNICORN_MAX_REQUESTS`` requests, with
+  jitter so they don't all restart at once
+- the master also runs ``manage.py send_rsvp_emails --loop``, the RSVP
+  email outbox worker, as a child process, since Railway runs only this
+  one command (``GUNICORN_EMAIL_WORKER=false`` if it runs elsewhere)
+
+See "Choosing gunicorn workers" in PROJECT_DOCUMENTATION.md for how these
+defaults were picked.
+"""
+
+import gc
+import logging
+import os
+import subprocess
+import sys
+import time
+from importlib import import_module
+
+logger = logging.getLogger('gunicorn.error')
+
+
+def _env(name, default, cast=str):
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    if cast is bool:
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return cast(value)
+
+
+def cpu_count():
+    """CPUs this process may run on, honouring a cgroup CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, round(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def memory_limit_mb():
+    """The container's memory limit (cgroup v2 or v1), else the machine's RAM; None if unknown."""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # cgroup v1 reports "no limit" as a huge number
+        if value != 'max' and int(value) < 1 << 60:
+            return int(value) // (1024 * 1024)
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+
+def default_workers(cpus, memory_mb, per_worker_mb, reserve_mb):
+    workers = 2 * cpus + 1
+    if memory_mb:
+        workers = min(workers, (memory_mb - reserve_mb) // per_worker_mb)
+    return max(1, workers)
+
+
+# Sizing
+CPUS = cpu_count()
+MEMORY_MB = memory_limit_mb()
+# Measured: a gthread worker of this app settles around 60 MB RSS, most
+# of it shared with the preloaded master; leave headroom for spikes
+WORKER_MEMORY_MB = _env('GUNICORN_WORKER_MEMORY_MB', 120, int)
+# Master process, the outbox worker and anything else in the container
+RESERVED_MEMORY_MB = _env('GUNICORN_RESERVED_MEMORY_MB', 200, int)
+
+bind = f"0.0.0.0:{_env('PORT', 8000, int)}"
+workers = _env(
+    'GUNICORN_WORKERS',
+    _env('WEB_CONCURRENCY', default_workers(CPUS, MEMORY_MB, WORKER_MEMORY_MB, RESERVED_MEMORY_MB), int),
+    int,
+)
+worker_class = _env('GUNICORN_WORKER_CLASS', 'gthread')
+threads = _env('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1, int)
+# GUNICORN_WORKER_CLASS=uvicorn serves the ASGI app instead: one event
+# loop per worker, with the async read-only views
+ASGI = worker_class == 'uvicorn'
+if ASGI:
+    worker_class = 'uvicorn_worker.UvicornWorker'
+wsgi_app = 'wedding_site.asgi:application' if ASGI else 'wedding_site.wsgi:application'
+
+# Import Django once in the master and fork it into every worker
+preload_app = _env('GUNICORN_PRELOAD', True, bool)
+
+# Timeouts: kill a stuck worker after `timeout`, give in-flight requests
+# `graceful_timeout` to finish on restart or deploy
+timeout = _env('GUNICORN_TIMEOUT', 30, int)
+graceful_timeout = _env('GUNICORN_GRACEFUL_TIMEOUT', 30, int)
+# Longer than the proxy's idle timeout would be pointless; long enough to
+# reuse connections for the page's follow-up requests
+keepalive = _env('GUNICORN_KEEPALIVE', 5, int)
+
+# Recycle workers to cap slow leaks; the jitter staggers the restarts
+max_requests = _env('GUNICORN_MAX_REQUESTS', 2000, int)
+max_requests_jitter = _env('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10, int)
+
+# Heartbeat files on tmpfs, so a slow disk can't make workers look hung
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# Drain the RSVP email outbox from a child of the master
+EMAIL_WORKER = _env('GUNICORN_EMAIL_WORKER', True, bool)
+
+accesslog = _env('GUNICORN_ACCESS_LOG', None)
+loglevel = _env('GUNICORN_LOG_LEVEL', 'info')
+statsd_host = _env('GUNICORN_STATSD_HOST', None)
+statsd_prefix = _env('GUNICORN_STATSD_PREFIX', 'wedding')
+
+
+# Lifecycle hooks. Each event is logged, and passed to the callable named
+# by GUNICORN_METRICS_HOOK ("package.module:function", called as
+# hook(event, **fields)) if there is one.
+
+_metrics_hook = None
+_email_worker = None
+
+
+def emit(event, **fields):
+    global _metrics_hook
+    logger.info("%s %s", event, ' '.join(f'{key}={value}' for key, value in fields.items()))
+    target = os.environ.get('GUNICORN_METRICS_HOOK')
+    if not target:
+        return
+    try:
+        if _metrics_hook is None:
+            module, _, name = target.partition(':')
+            _metrics_hook = getattr(import_module(module), name)
+        _metrics_hook(event, **fields)
+    except Exception:
+        logger.exception("Metrics hook %s failed for %s", target, event)
+
+
+def when_ready(server):
+    warm_up_ms = 0
+    if preload_app:
+        # Pay the first-request costs once here rather than in every new worker
+        from wedding.boot import warm_up
+        warm_up_ms = round(warm_up() * 1000)
+        # Keep the garbage collector off the preloaded objects, or its
+        # bookkeeping writes copy the shared pages into every worker
+        gc.freeze()
+    emit(
+        'server.ready', workers=server.num_workers, worker_class=worker_class, threads=threads,
+        cpus=CPUS, memory_mb=MEMORY_MB, preload=preload_app, warm_up_ms=warm_up_ms,
+    )
+    if EMAIL_WORKER:
+        global _email_worker
+        _email_worker = subprocess.Popen(
+            [sys.executable, 'manage.py', 'send_rsvp_emails', '--loop'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        emit('email_worker.started', pid=_email_worker.pid)
+
+
+def pre_fork(server, worker):
+    worker._forked_at = time.monotonic()
+
+
+def post_fork(server, worker):
+    # Connections opened while preloading must not be shared between processes
+    if preload_app:
+        from django.db import connections
+        connections.close_all()
+
+
+def post_worker_init(worker):
+    booted_ms = (time.monotonic() - getattr(worker, '_forked_at', time.monotonic())) * 1000
+    emit('worker.booted', pid=worker.pid, boot_ms=round(booted_ms))
+
+
+def worker_abort(worker):
+    # SIGABRT from the master: the worker overran `timeout`
+    emit('worker.timeout', pid=worker.pid, timeout=timeout)
+
+
+def worker_exit(server, worker):
+    # Runs in the worker, so only on a clean exit (recycled, restarted or shut down)
+    from django.db import connections
+    from wedding.db_stats import connection_stats
+
+    emit('worker.exit', pid=worker.pid, requests=worker.nr)
+    emit('worker.db', **connection_stats())
+    # Hand pooled connections back to Postgres now rather than leaving
+    # them to time out when the process goes
+    for connection in connections.all(initialized_only=True):
+        if getattr(connection, 'pool', None):
+            connection.close_pool()
+
+
+def child_exit(server, worker):
+    # Runs in the master for every worker that goes away, including ones
+    # killed outright (OOM, SIGKILL after a timeout); gunicorn logs the reason
+    lived = time.monotonic() - getattr(worker, '_forked_at', time.monotonic())
+    emit('worker.reaped', pid=worker.pid, lived_s=round(lived))
+
+
+def on_exit(server):
+    if _email_worker is not None and _email_worker.poll() is None:
+        # Rows it was sending stay claimed and are retried after CLAIM_TIMEOUT
+        _email_worker.terminate()
+        try:
+            _email_worker.wait(timeout=graceful_timeout)
+        except subprocess.TimeoutExpired:
+            _email_worker.kill()
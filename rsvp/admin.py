@@ -1,15 +1,214 @@
-from django.contrib import admin
-from .models import Guest
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Q
+from django.forms import modelformset_factory
+from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.functional import cached_property
+from django.utils import timezone
+from django.utils.html import format_html
+
+from .exports import caterer_report, caterer_report_csv, export_response
+from .forms import HouseholdFormSet
+from .models import Guest, OutboxEmail, normalize_name
+from .stats import dashboard
+
+# Editable per guest on the household page
+HOUSEHOLD_FIELDS = ['first_name', 'last_name', 'email', 'attending', 'dietary_restrictions']
+
+
+class EstimatedCountPaginator(Paginator):
+    """Uses Postgres's row estimate instead of COUNT(*) for a long, unfiltered guest list.
+
+    Filtered lists, small tables and other databases are counted exactly.
+    """
+    # Below this many rows an exact count is cheap enough
+    estimate_above = 10_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if not queryset.query.where and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] > self.estimate_above:
+                return int(row[0])
+        return super().count
+
 
 @admin.register(Guest)
 class GuestAdmin(admin.ModelAdmin):
-    list_display = ('first_name', 'last_name', 'email', 'attending', 'group_id')
+    actions = ['mark_attending', 'mark_declined', 'mark_pending', 'export_csv', 'export_json', 'caterer_report_csv']
+    list_display = ('display_first_name', 'display_last_name', 'email', 'attending', 'household')
+    list_filter = ('attending',)
+    # Served by the normalized name index
+    ordering = ('last_name_normalized', 'first_name_normalized', 'id')
+    search_fields = ('first_name_normalized', 'last_name_normalized', 'email')
+    search_help_text = "Matches the start of a first name, last name or email."
+    paginator = EstimatedCountPaginator
+    # Skip the second COUNT(*) over the whole table on filtered pages
+    show_full_result_count = False
+    readonly_fields = ('household',)
     fields = (
         'first_name',
         'last_name',
         'email',
         'attending',
         'group_id',  # 👈 add this to make it editable!
+        'household',
         'dietary_restrictions',
         'message_for_couple',
-    )
\ No newline at end of file
+    )
+
+    @admin.display(description='First name', ordering='first_name_normalized')
+    def display_first_name(self, guest):
+        return guest.first_name
+
+    @admin.display(description='Last name', ordering='last_name_normalized')
+    def display_last_name(self, guest):
+        return guest.last_name
+
+    @admin.display(description='Household', ordering='group_id')
+    def household(self, guest):
+        url = reverse('admin:rsvp_guest_household', args=[guest.group_id])
+        return format_html('<a href="{}">Edit household</a>', url)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Prefix-match each word against the indexed normalized names and email."""
+        for word in search_term.split():
+            name = normalize_name(word)
+            queryset = queryset.filter(
+                Q(first_name_normalized__startswith=name)
+                | Q(last_name_normalized__startswith=name)
+                # Guest.save() and the bulk writes store emails lowercased
+                | Q(email__startswith=word.lower())
+            )
+        return queryset, False
+
+    def _set_attending(self, request, queryset, attending, label):
+        guests = [
+            guest for guest in queryset.only('group_id', 'attending', 'version')
+            if guest.attending is not attending
+        ]
+        for guest in guests:
+            guest.attending = attending
+            # Open RSVP forms for these guests should see the change as a conflict
+            guest.version += 1
+        Guest.objects.bulk_update(guests, ['attending', 'version'], batch_size=500)
+        self.message_user(request, f"Marked {len(guests)} guest{'s' if len(guests) != 1 else ''} as {label}.")
+
+    @admin.action(description="Mark selected guests as attending")
+    def mark_attending(self, request, queryset):
+        self._set_attending(request, queryset, True, 'attending')
+
+    @admin.action(description="Mark selected guests as declined")
+    def mark_declined(self, request, queryset):
+        self._set_attending(request, queryset, False, 'declined')
+
+    @admin.action(description="Mark selected guests as not yet replied")
+    def mark_pending(self, request, queryset):
+        self._set_attending(request, queryset, None, 'not yet replied')
+
+    @admin.action(description="Export selected guests as CSV")
+    def export_csv(self, request, queryset):
+        return export_response(queryset, 'csv')
+
+    @admin.action(description="Export selected guests as JSON")
+    def export_json(self, request, queryset):
+        return export_response(queryset, 'json')
+
+    @admin.action(description="Caterer report for selected guests (CSV)")
+    def caterer_report_csv(self, request, queryset):
+        response = HttpResponse(''.join(caterer_report_csv(caterer_report(queryset))), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="caterer-report.csv"'
+        return response
+
+    def get_urls(self):
+        return [
+            path('dashboard/', self.admin_site.admin_view(self.dashboard_view), name='rsvp_guest_dashboard'),
+            path(
+                'household/<uuid:group_id>/',
+                self.admin_site.admin_view(self.household_view),
+                name='rsvp_guest_household',
+            ),
+        ] + super().get_urls()
+
+    def dashboard_view(self, request):
+        """Attending / declined / pending counts overall and per group, from the RSVP counters."""
+        return TemplateResponse(request, 'admin/rsvp/guest/dashboard.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'RSVP dashboard',
+            'dashboard': dashboard(),
+            # Seconds between reloads while the page is open
+            'refresh': 30,
+        })
+
+    def household_view(self, request, group_id):
+        """Edit every guest in a group on one page, with a blank row to add a member."""
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        queryset = Guest.objects.filter(group_id=group_id).order_by('id')
+        if not queryset.exists():
+            raise Http404("No guests in this household")
+        can_add = self.has_add_permission(request)
+        GuestFormSet = modelformset_factory(
+            Guest, formset=HouseholdFormSet, fields=HOUSEHOLD_FIELDS, extra=1 if can_add else 0,
+        )
+        formset = GuestFormSet(request.POST or None, queryset=queryset)
+        if request.method == 'POST' and formset.is_valid():
+            try:
+                with transaction.atomic():
+                    # Without add permission, ignore any extra rows forged into the POST
+                    for form in formset.forms if can_add else formset.initial_forms:
+                        if not form.has_changed():
+                            continue
+                        adding = form.instance._state.adding
+                        guest = form.save(commit=False)
+                        guest.group_id = group_id
+                        guest.save()
+                        message = self.construct_change_message(request, form, None, adding)
+                        if adding:
+                            self.log_addition(request, guest, message)
+                        else:
+                            self.log_change(request, guest, message)
+            except IntegrityError:
+                # Rows are saved one by one, so swapping two names, or a
+                # concurrent edit, can still trip the unique name constraint
+                self.message_user(
+                    request, "Two guests in this household would have the same name; nothing was saved.",
+                    messages.ERROR,
+                )
+            else:
+                self.message_user(request, "Household saved.")
+                return HttpResponseRedirect(request.path)
+        return TemplateResponse(request, 'admin/rsvp/guest/household.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Edit household',
+            'group_id': group_id,
+            'formset': formset,
+        })
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    actions = ['retry_now']
+    list_display = ('to', 'kind', 'status', 'attempts', 'send_after', 'sent_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('to',)
+    ordering = ('-created_at',)
+    readonly_fields = ('group_id', 'to', 'kind', 'subject', 'body', 'attempts', 'last_error', 'created_at', 'sent_at')
+    fields = readonly_fields[:5] + ('status', 'send_after') + readonly_fields[5:]
+
+    @admin.action(description="Send selected emails again on the next worker run")
+    def retry_now(self, request, queryset):
+        count = queryset.exclude(status__in=[OutboxEmail.SENT, OutboxEmail.SENDING]).update(
+            status=OutboxEmail.PENDING, attempts=0, send_after=timezone.now(),
+        )
+        self.message_user(request, f"Queued {count} email{'s' if count != 1 else ''} to send again.")
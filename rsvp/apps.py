@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RsvpConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rsvp'
+
+    def ready(self):
+        # Registers the signal receivers that keep the name index and RSVP counters current
+        from . import search, stats  # noqa: F401
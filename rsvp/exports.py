@@ -0,0 +1,107 @@
+"""
+Guest list exports and the caterer report.
+
+Exports stream straight from a server-side cursor: rows are fetched
+``EXPORT_CHUNK_SIZE`` at a time with ``.iterator()`` and encoded as they
+go, so memory stays flat however long the list is. The caterer report is
+computed entirely with aggregate queries.
+"""
+
+import csv
+import json
+from collections import namedtuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Q
+from django.db.models.functions import Lower, Trim
+from django.http import StreamingHttpResponse
+
+EXPORT_FIELDS = [
+    'group_id', 'first_name', 'last_name', 'email',
+    'attending', 'dietary_restrictions', 'message_for_couple',
+]
+EXPORT_CHUNK_SIZE = 500
+EXPORT_FORMATS = {'csv': 'text/csv', 'json': 'application/json'}
+# What guests type when they mean "no restrictions"
+NO_RESTRICTIONS = {'', 'none', 'n/a', 'na', 'no', 'nope', '-'}
+
+CatererReport = namedtuple('CatererReport', 'attending declined pending total dietary')
+
+
+class _Echo:
+    """File-like object whose write() hands back what it was given, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _rows(queryset):
+    return queryset.order_by('last_name', 'first_name', 'id').values_list(*EXPORT_FIELDS).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE,
+    )
+
+
+def stream_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in _rows(queryset):
+        yield writer.writerow(row)
+
+
+def stream_json(queryset):
+    encoder = DjangoJSONEncoder()
+    yield '['
+    separator = ''
+    for row in _rows(queryset):
+        yield separator + encoder.encode(dict(zip(EXPORT_FIELDS, row)))
+        separator = ','
+    yield ']'
+
+
+def export_response(queryset, fmt, filename='guests'):
+    """StreamingHttpResponse of ``queryset`` as a CSV or JSON download."""
+    stream = stream_csv(queryset) if fmt == 'csv' else stream_json(queryset)
+    response = StreamingHttpResponse(stream, content_type=EXPORT_FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+def caterer_report(queryset):
+    """Headcounts plus attending guests' dietary restrictions, grouped case- and space-insensitively."""
+    # Aggregate aliases can't shadow model fields, hence the n_ prefix
+    counts = queryset.aggregate(
+        n_attending=Count('id', filter=Q(attending=True)),
+        n_declined=Count('id', filter=Q(attending=False)),
+        n_pending=Count('id', filter=Q(attending__isnull=True)),
+        n_total=Count('id'),
+    )
+    dietary = (
+        queryset.filter(attending=True, dietary_restrictions__isnull=False)
+        .annotate(tag=Lower(Trim('dietary_restrictions')))
+        .exclude(tag__in=NO_RESTRICTIONS)
+        .values('tag')
+        .annotate(count=Count('id'))
+        .order_by('-count', 'tag')
+    )
+    return CatererReport(
+        attending=counts['n_attending'],
+        declined=counts['n_declined'],
+        pending=counts['n_pending'],
+        total=counts['n_total'],
+        dietary=[(row['tag'], row['count']) for row in dietary],
+    )
+
+
+def caterer_report_csv(report):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(['section', 'item', 'count'])
+    for label in ('attending', 'declined', 'pending', 'total'):
+        yield writer.writerow(['headcount', label, getattr(report, label)])
+    for tag, count in report.dietary:
+        yield writer.writerow(['dietary', tag, count])
+
+
+def caterer_report_json(report):
+    data = report._asdict()
+    data['dietary'] = [{'restriction': tag, 'count': count} for tag, count in report.dietary]
+    return json.dumps(data)
@@ -1,7 +1,7 @@
 from django import forms
 from django.core.validators import EmailValidator
 from django.utils.safestring import mark_safe
-from .models import Guest
+from .models import Guest, normalize_name
 
 class GuestLookupForm(forms.Form):
     first_name = forms.CharField(max_length=100, label='')
@@ -55,4 +55,26 @@ class RSVPDetailsForm(forms.ModelForm):
             raise forms.ValidationError('Email address is required.')
         
         # Django's EmailField already validates format, but we can add custom logic here
-        return email.lower().strip()
\ No newline at end of file
+        return email.lower().strip()
+
+
+class HouseholdFormSet(forms.BaseModelFormSet):
+    """The admin household page's guests.
+
+    group_id and the normalized names aren't form fields, so model
+    validation can't see the one-name-per-household constraint; check it
+    across the rows here instead of failing on save.
+    """
+
+    def clean(self):
+        super().clean()
+        seen = set()
+        for form in self.forms:
+            if form.errors or not form.cleaned_data:
+                continue
+            name = (normalize_name(form.cleaned_data.get('first_name')), normalize_name(form.cleaned_data.get('last_name')))
+            if name in seen:
+                raise forms.ValidationError(
+                    f"{form.cleaned_data['first_name']} {form.cleaned_data['last_name']} is already in this household."
+                )
+            seen.add(name)
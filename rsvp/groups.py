@@ -0,0 +1,29 @@
+"""
+Loading a guest group for the group RSVP views.
+
+Each view used to build several querysets for the same group (everyone,
+attending, declined) and evaluate them separately. ``load_group`` fetches
+the group once and partitions it in Python into an immutable snapshot the
+view and template can iterate as often as they like.
+"""
+
+from collections import namedtuple
+
+from .models import Guest
+
+# Every member tuple holds Guest instances in id order
+GroupSnapshot = namedtuple('GroupSnapshot', 'group_id guests attending declined pending')
+
+
+def load_group(group_id):
+    """Fetch every guest in ``group_id`` with one query; None if the group is empty."""
+    guests = tuple(Guest.objects.filter(group_id=group_id).order_by('id'))
+    if not guests:
+        return None
+    return GroupSnapshot(
+        group_id=group_id,
+        guests=guests,
+        attending=tuple(g for g in guests if g.attending is True),
+        declined=tuple(g for g in guests if g.attending is False),
+        pending=tuple(g for g in guests if g.attending is None),
+    )
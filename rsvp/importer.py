@@ -0,0 +1,257 @@
+"""
+Guest list import from CSV or XLSX.
+
+Rows are read one at a time and written in batches: each batch costs one
+SELECT (existing guests with the batch's names, plus one for the
+members of any pre-existing group a new household may join) and one upsert
+(``bulk_create(update_conflicts=True)`` keyed on group plus normalized
+name), so re-importing a list of a few thousand guests takes seconds and
+memory stays flat. Unchanged guests are not written at all.
+
+Each row names its household, and a household gets a ``group_id``
+derived from that name, so the same file always produces the same
+groups. A household whose rows match exactly the guests of one other
+group (added before the importer existed) keeps that group instead. An
+explicit ``group_id`` column overrides both.
+"""
+
+import csv
+import os
+import uuid
+from collections import Counter, namedtuple
+from itertools import islice
+
+from django.db import transaction
+
+from .models import Guest, normalize_email, normalize_name
+
+try:
+    import openpyxl
+except ImportError:  # XLSX import is optional
+    openpyxl = None
+
+REQUIRED_COLUMNS = {'household', 'first_name', 'last_name', 'email'}
+# Written on import; RSVP answers (attending, message_for_couple) never are
+IMPORTED_FIELDS = ['first_name', 'last_name', 'email', 'dietary_restrictions']
+UNIQUE_FIELDS = ['group_id', 'last_name_normalized', 'first_name_normalized']
+HOUSEHOLD_NAMESPACE = uuid.UUID('afe7b989-7944-412a-90e2-d2f731db19ff')
+DEFAULT_BATCH_SIZE = 500
+
+ImportRow = namedtuple('ImportRow', 'line household first_name last_name email dietary_restrictions group_id')
+# kind is 'created' or 'updated'; changes maps field -> (old, new)
+GuestChange = namedtuple('GuestChange', 'kind guest changes')
+
+
+class GuestImportError(Exception):
+    """The file can't be imported at all (unknown type, missing columns)."""
+
+
+def _column(name):
+    return '_'.join(str(name or '').strip().lower().split())
+
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = [_column(name) for name in next(reader, [])]
+        yield header
+        yield from reader
+
+
+def _read_xlsx(path):
+    if openpyxl is None:
+        raise GuestImportError("Reading .xlsx files needs openpyxl (pip install openpyxl)")
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        yield [_column(name) for name in next(rows, ())]
+        for row in rows:
+            yield ['' if value is None else str(value) for value in row]
+    finally:
+        workbook.close()
+
+
+def read_rows(path):
+    """Yield an ImportRow per non-blank data row of a .csv or .xlsx file."""
+    extension = os.path.splitext(path)[1].lower()
+    readers = {'.csv': _read_csv, '.xlsx': _read_xlsx}
+    if extension not in readers:
+        raise GuestImportError(f"Don't know how to read {extension or 'this'} files; use .csv or .xlsx")
+    rows = readers[extension](path)
+    header = next(rows)
+    missing = REQUIRED_COLUMNS - set(header)
+    if missing:
+        raise GuestImportError(f"Missing column(s): {', '.join(sorted(missing))}")
+
+    for line, values in enumerate(rows, start=2):
+        row = {name: (value or '').strip() for name, value in zip(header, values)}
+        if not any(row.values()):
+            continue
+        yield ImportRow(
+            line=line,
+            household=row['household'],
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            email=row['email'],
+            dietary_restrictions=row.get('dietary_restrictions') or None,
+            group_id=row.get('group_id') or None,
+        )
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class GuestImporter:
+    """
+    Upserts guests from ImportRows.
+
+    ``stats`` counts created / updated / unchanged / skipped rows,
+    ``errors`` holds a message per skipped row, and ``report`` (if given)
+    is called with a GuestChange for every guest written.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, dry_run=False, report=None):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.report = report
+        self.stats = Counter()
+        self.errors = []
+        # Normalized household name -> group_id, for households split across batches
+        self.group_ids = {}
+
+    def run(self, rows):
+        for batch in _batches(rows, self.batch_size):
+            self.import_batch(batch)
+        return self.stats
+
+    def import_batch(self, rows):
+        rows = [row for row in rows if self._valid(row)]
+        existing = self._existing_guests(rows)
+        self._resolve_households(rows, existing)
+
+        pending = {}
+        for row in rows:
+            guest = Guest(
+                group_id=self.group_ids[normalize_name(row.household)],
+                first_name=row.first_name,
+                last_name=row.last_name,
+                # Stored lowercased, so compare in the same form
+                email=normalize_email(row.email),
+                dietary_restrictions=row.dietary_restrictions,
+            )
+            guest.normalize_names()
+            key = (guest.group_id, guest.last_name_normalized, guest.first_name_normalized)
+            if key in pending:
+                self._skip(row, "same guest as an earlier row in this household")
+                continue
+            pending[key] = guest
+
+        to_write = []
+        for key, guest in pending.items():
+            current = existing.get(key)
+            if current is None:
+                change = GuestChange('created', guest, {})
+            else:
+                changes = {
+                    field: (getattr(current, field), getattr(guest, field))
+                    for field in IMPORTED_FIELDS
+                    if getattr(current, field) != getattr(guest, field)
+                }
+                if not changes:
+                    self.stats['unchanged'] += 1
+                    continue
+                # Open RSVP forms for this guest should see the edit as a conflict
+                guest.version = current.version + 1
+                change = GuestChange('updated', guest, changes)
+            self.stats[change.kind] += 1
+            to_write.append(guest)
+            if self.report is not None:
+                self.report(change)
+
+        if to_write and not self.dry_run:
+            with transaction.atomic():
+                Guest.objects.bulk_create(
+                    to_write,
+                    update_conflicts=True,
+                    unique_fields=UNIQUE_FIELDS,
+                    update_fields=IMPORTED_FIELDS + ['version'],
+                )
+
+    def _valid(self, row):
+        for field in ('household', 'first_name', 'last_name', 'email'):
+            if not getattr(row, field):
+                return self._skip(row, f"{field} is blank")
+        if row.group_id:
+            try:
+                group_id = uuid.UUID(row.group_id)
+            except ValueError:
+                return self._skip(row, f"group_id {row.group_id!r} is not a UUID")
+            household = normalize_name(row.household)
+            if self.group_ids.setdefault(household, group_id) != group_id:
+                return self._skip(row, "group_id differs from the rest of the household")
+        return True
+
+    def _skip(self, row, message):
+        self.stats['skipped'] += 1
+        self.errors.append(f"line {row.line}: {message}")
+        return False
+
+    def _existing_guests(self, rows):
+        """Guests already stored under any of the batch's names, by unique key."""
+        if not rows:
+            return {}
+        firsts = {normalize_name(row.first_name) for row in rows}
+        lasts = {normalize_name(row.last_name) for row in rows}
+        guests = Guest.objects.filter(
+            first_name_normalized__in=firsts, last_name_normalized__in=lasts,
+        ).only('group_id', 'version', 'first_name_normalized', 'last_name_normalized', *IMPORTED_FIELDS)
+        return {
+            (guest.group_id, guest.last_name_normalized, guest.first_name_normalized): guest
+            for guest in guests
+        }
+
+    def _resolve_households(self, rows, existing):
+        """Fill ``group_ids`` for households seen for the first time in this batch.
+
+        A household uses the group derived from its name. It only joins
+        another group, one created outside the importer, when none of its
+        guests is in the derived group yet, its stored guests all sit in
+        that one group, and every guest of that group is among its rows.
+        A guest who merely shares a name with someone in another household
+        therefore never lands in (and overwrites) that household.
+        """
+        groups_by_name = {}
+        existing_groups = set()
+        for group_id, last, first in existing:
+            groups_by_name.setdefault((last, first), set()).add(group_id)
+            existing_groups.add(group_id)
+
+        names, matches = {}, {}
+        for row in rows:
+            household = normalize_name(row.household)
+            if household in self.group_ids:
+                continue
+            name = (normalize_name(row.last_name), normalize_name(row.first_name))
+            names.setdefault(household, set()).add(name)
+            matches.setdefault(household, set()).update(groups_by_name.get(name, ()))
+
+        candidates = {}
+        for household, groups in matches.items():
+            if uuid.uuid5(HOUSEHOLD_NAMESPACE, household) not in existing_groups and len(groups) == 1:
+                candidates[household] = next(iter(groups))
+        members = {}
+        for group_id, last, first in Guest.objects.filter(group_id__in=candidates.values()).values_list(
+            'group_id', 'last_name_normalized', 'first_name_normalized'
+        ):
+            members.setdefault(group_id, set()).add((last, first))
+        claimed = set(self.group_ids.values())
+
+        for household in matches:
+            group_id = candidates.get(household)
+            if group_id is None or group_id in claimed or not members[group_id] <= names[household]:
+                group_id = uuid.uuid5(HOUSEHOLD_NAMESPACE, household)
+            claimed.add(group_id)
+            self.group_ids[household] = group_id
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rsvp.importer import DEFAULT_BATCH_SIZE, GuestImporter, GuestImportError, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Import or re-import the guest list from a CSV or XLSX file with columns "
+        "household, first_name, last_name, email and optionally dietary_restrictions "
+        "and group_id. Guests are matched on household plus name; changed guests are "
+        "updated and unchanged ones left alone."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to a .csv or .xlsx file.')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without writing anything.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Rows per upsert (default: {DEFAULT_BATCH_SIZE}).',
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+        importer = GuestImporter(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            report=self.report_change if verbosity >= 2 else None,
+        )
+        started = time.monotonic()
+        try:
+            stats = importer.run(read_rows(options['path']))
+        except (GuestImportError, OSError) as exc:
+            raise CommandError(exc)
+
+        for error in importer.errors:
+            self.stderr.write(self.style.WARNING(f"  skipped {error}"))
+        summary = (
+            f"{stats['created']} created, {stats['updated']} updated, "
+            f"{stats['unchanged']} unchanged, {stats['skipped']} skipped "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"Dry run, nothing written: {summary}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
+
+    def report_change(self, change):
+        guest = change.guest
+        if change.kind == 'created':
+            self.stdout.write(f"  + {guest} ({guest.email})")
+            return
+        details = ', '.join(f"{field}: {old!r} -> {new!r}" for field, (old, new) in change.changes.items())
+        self.stdout.write(f"  ~ {guest}: {details}")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from rsvp.stats import recompute
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the RSVP dashboard counters from the guest table, fixing any "
+        "that have drifted (e.g. after editing guests outside the app)."
+    )
+
+    def handle(self, *args, **options):
+        fixed = recompute()
+        if fixed:
+            self.stdout.write(self.style.WARNING(f"Fixed {fixed} group counter{'s' if fixed != 1 else ''}."))
+        else:
+            self.stdout.write(self.style.SUCCESS("RSVP counters were already correct."))
@@ -0,0 +1,65 @@
+import time
+import traceback
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from rsvp.notifications import send_due_emails
+
+
+class Command(BaseCommand):
+    help = (
+        "Send queued RSVP emails in batches over one SMTP connection each, "
+        "rescheduling failures with backoff. Runs once by default; pass --loop "
+        "to keep polling the outbox as a worker process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Emails per connection (default: settings.RSVP_EMAIL_BATCH_SIZE).',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, polling for new emails.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=10,
+            help='Seconds to wait between polls when the outbox is empty (default: 10).',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                stats = self.drain(options['batch_size'])
+            except Exception:
+                if not options['loop']:
+                    raise
+                # A worker must outlive a database restart; claimed rows are retried later
+                self.stderr.write(traceback.format_exc())
+                close_old_connections()
+                time.sleep(options['interval'])
+                continue
+            if stats or options['verbosity'] >= 2:
+                self.stdout.write(
+                    f"{stats['sent']} sent, {stats['retried']} to retry, {stats['failed']} failed, "
+                    f"{stats['superseded']} replaced by a newer answer"
+                )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def drain(self, batch_size):
+        """Send batches until none are due."""
+        total = Counter()
+        while True:
+            stats = send_due_emails(batch_size)
+            if not stats:
+                return total
+            total.update(stats)
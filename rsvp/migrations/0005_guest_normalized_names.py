@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:36
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+# A frozen copy of rsvp.models.normalize_name as of this migration, so the
+# backfill gives the same result however that function changes later
+def normalize_name(value):
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', value)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ''.join(stripped.casefold().split())
+
+
+def forwards(apps, schema_editor):
+    Guest = apps.get_model('rsvp', 'Guest')
+    guests = list(Guest.objects.only('first_name', 'last_name'))
+    for guest in guests:
+        guest.first_name_normalized = normalize_name(guest.first_name)
+        guest.last_name_normalized = normalize_name(guest.last_name)
+    Guest.objects.bulk_update(
+        guests, ['first_name_normalized', 'last_name_normalized'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rsvp', '0004_alter_guest_dietary_restrictions_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='guest',
+            name='first_name_normalized',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='guest',
+            name='last_name_normalized',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='guest',
+            index=models.Index(fields=['last_name_normalized', 'first_name_normalized'], name='rsvp_guest_name_norm_idx'),
+        ),
+    ]
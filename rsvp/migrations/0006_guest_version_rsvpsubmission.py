@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rsvp', '0005_guest_normalized_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RSVPSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.UUIDField(unique=True)),
+                ('redirect_url', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='guest',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
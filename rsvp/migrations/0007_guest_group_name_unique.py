@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rsvp', '0006_guest_version_rsvpsubmission'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='guest',
+            constraint=models.UniqueConstraint(fields=('group_id', 'last_name_normalized', 'first_name_normalized'), name='rsvp_guest_group_name_uniq'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:00
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_existing_guests(apps, schema_editor):
+    Guest = apps.get_model('rsvp', 'Guest')
+    RSVPCounter = apps.get_model('rsvp', 'RSVPCounter')
+    db = schema_editor.connection.alias
+    names = {}
+    for group_id, first, last in Guest.objects.using(db).order_by('id').values_list('group_id', 'first_name', 'last_name'):
+        names.setdefault(group_id, []).append(f"{first} {last}")
+    counts = Guest.objects.using(db).values('group_id').annotate(
+        n_attending=Count('id', filter=Q(attending=True)),
+        n_declined=Count('id', filter=Q(attending=False)),
+        n_pending=Count('id', filter=Q(attending__isnull=True)),
+    ).order_by()
+    RSVPCounter.objects.using(db).bulk_create([
+        RSVPCounter(
+            group_id=row['group_id'],
+            label=', '.join(names[row['group_id']])[:255],
+            attending=row['n_attending'],
+            declined=row['n_declined'],
+            pending=row['n_pending'],
+        )
+        for row in counts
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rsvp', '0007_guest_group_name_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RSVPCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group_id', models.UUIDField(unique=True)),
+                ('label', models.CharField(blank=True, max_length=255)),
+                ('attending', models.IntegerField(default=0)),
+                ('declined', models.IntegerField(default=0)),
+                ('pending', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_existing_guests, migrations.RunPython.noop),
+    ]
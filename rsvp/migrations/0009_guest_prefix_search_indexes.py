@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rsvp', '0008_rsvpcounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='guest',
+            index=models.Index(fields=['first_name_normalized'], name='rsvp_guest_first_norm_like', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='guest',
+            index=models.Index(fields=['last_name_normalized'], name='rsvp_guest_last_norm_like', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='guest',
+            index=models.Index(fields=['email'], name='rsvp_guest_email_like', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
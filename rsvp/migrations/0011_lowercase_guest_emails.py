@@ -0,0 +1,20 @@
+from django.db import migrations
+from django.db.models.functions import Lower
+
+
+def forwards(apps, schema_editor):
+    Guest = apps.get_model('rsvp', 'Guest')
+    Guest.objects.exclude(email=Lower('email')).update(email=Lower('email'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rsvp', '0010_outboxemail'),
+    ]
+
+    # Guest.save() and the bulk writes lowercase emails from here on;
+    # the admin's prefix search relies on it
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
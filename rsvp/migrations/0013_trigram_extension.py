@@ -0,0 +1,14 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rsvp', '0012_outboxemail_sending'),
+    ]
+
+    # For RSVP_GUEST_SEARCH_BACKEND = 'postgres'; does nothing on other databases
+    operations = [
+        TrigramExtension(),
+    ]
@@ -1,14 +1,358 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.dispatch import Signal
+from django.utils import timezone
+import unicodedata
 import uuid
 
+
+def normalize_name(value):
+    """Fold a name to the form stored in the ``*_normalized`` columns.
+
+    Casefolds, strips accents and removes all whitespace so that
+    "  José ", "jose" and "JOSE" resolve to the same indexed value.
+    """
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', value)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ''.join(stripped.casefold().split())
+
+
+def normalize_email(value):
+    """Emails are stored lowercased, so the admin's prefix search can use its index."""
+    return value.strip().lower() if value else value
+
+
+NAME_FIELDS = {'first_name', 'last_name'}
+NORMALIZED_NAME_FIELDS = ['first_name_normalized', 'last_name_normalized']
+
+# Sent after bulk_create/bulk_update/update, which bypass post_save.
+# ``fields`` is the list of columns written (None for new rows), ``objs``
+# the affected instances, when known, ``group_ids`` the groups an update()
+# touched (None if unknown), and ``counted`` is True when the write
+# already updated the RSVP counters itself.
+guests_bulk_changed = Signal()
+
+# Fields whose changes move a guest between RSVPCounter columns
+COUNTED_FIELDS = {'group_id', 'attending'}
+# Guest._counted when the instance was loaded without group_id or attending
+_UNCOUNTED = object()
+
+
+class GuestVersionConflict(Exception):
+    """A versioned write found a guest already changed by someone else."""
+
+
+class GuestQuerySet(models.QuerySet):
+    """Keeps the normalized name columns in step on bulk writes."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.normalize_names()
+            obj.email = normalize_email(obj.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields and NAME_FIELDS & set(update_fields):
+            kwargs['update_fields'] = list(update_fields) + [
+                f for f in NORMALIZED_NAME_FIELDS if f not in update_fields
+            ]
+        created = super().bulk_create(objs, *args, **kwargs)
+        guests_bulk_changed.send(sender=self.model, fields=None, objs=created)
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        fields = list(fields)
+        objs = list(objs)
+        if NAME_FIELDS & set(fields):
+            for obj in objs:
+                obj.normalize_names()
+            fields += [f for f in NORMALIZED_NAME_FIELDS if f not in fields]
+        if 'email' in fields:
+            for obj in objs:
+                obj.email = normalize_email(obj.email)
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        guests_bulk_changed.send(sender=self.model, fields=fields, objs=objs)
+        return rows
+
+    def update(self, **kwargs):
+        for field in NAME_FIELDS:
+            if isinstance(kwargs.get(field), str):
+                kwargs[f'{field}_normalized'] = normalize_name(kwargs[field])
+        if isinstance(kwargs.get('email'), str):
+            kwargs['email'] = normalize_email(kwargs['email'])
+        with transaction.atomic(using=self.db):
+            group_ids = None
+            if COUNTED_FIELDS & set(kwargs):
+                # The groups the rows are in now, and the one they move to
+                group_ids = set(self.order_by().values_list('group_id', flat=True).distinct())
+                if 'group_id' in kwargs:
+                    try:
+                        group_ids.add(uuid.UUID(str(kwargs['group_id'])))
+                    except ValueError:
+                        group_ids = None  # An expression; any group may be the target
+            rows = super().update(**kwargs)
+            guests_bulk_changed.send(sender=self.model, fields=list(kwargs), objs=None, group_ids=group_ids)
+        return rows
+
+    def bulk_update_versioned(self, objs, fields):
+        """Write ``fields`` on ``objs`` only if no one else has changed them.
+
+        Each row is matched on the ``version`` its instance carries, all in
+        a single UPDATE that also bumps the version. If any row has moved
+        on, nothing is written and GuestVersionConflict is raised.
+        """
+        objs = list(objs)
+        if not objs:
+            return 0
+        fields = list(fields)
+        if NAME_FIELDS & set(fields):
+            for obj in objs:
+                obj.normalize_names()
+            fields += [f for f in NORMALIZED_NAME_FIELDS if f not in fields]
+
+        condition = Q()
+        for obj in objs:
+            condition |= Q(pk=obj.pk, version=obj.version)
+        if len(objs) == 1:
+            values = {f: getattr(objs[0], f) for f in fields}
+        else:
+            values = {
+                f: Case(
+                    *[When(pk=obj.pk, then=Value(getattr(obj, f))) for obj in objs],
+                    output_field=self.model._meta.get_field(f),
+                )
+                for f in fields
+            }
+
+        with transaction.atomic(using=self.db):
+            # Plain QuerySet.update: names are already normalized above
+            rows = models.QuerySet.update(self.filter(condition), version=F('version') + 1, **values)
+            if rows != len(objs):
+                raise GuestVersionConflict(
+                    f"{len(objs) - rows} of {len(objs)} guests changed since they were loaded"
+                )
+            if COUNTED_FIELDS & set(fields):
+                # Every row matched its loaded version, so what each instance
+                # was loaded with is exactly what the counters hold for it
+                RSVPCounter.objects.using(self.db).record_changes(
+                    (obj._counted, obj.counted_as()) for obj in objs
+                )
+        for obj in objs:
+            obj.version += 1
+            obj._counted = obj.counted_as()
+        guests_bulk_changed.send(sender=self.model, fields=fields, objs=objs, counted=True)
+        return rows
+
+    def lookup(self, first_name, last_name):
+        """Guests whose names match after normalization (index-backed)."""
+        return self.filter(
+            last_name_normalized=normalize_name(last_name),
+            first_name_normalized=normalize_name(first_name),
+        )
+
+
 class Guest(models.Model):
     group_id = models.UUIDField(default=uuid.uuid4, editable=True, db_index=True)
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
+    first_name_normalized = models.CharField(max_length=100, editable=False, default='')
+    last_name_normalized = models.CharField(max_length=100, editable=False, default='')
     email = models.EmailField(blank=False)
     dietary_restrictions = models.TextField(blank=True, null=True)
     message_for_couple = models.TextField(blank=True, null=True)
     attending = models.BooleanField(null=True, blank=True)
+    # Bumped on every write; RSVP forms post it back for optimistic locking
+    version = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = GuestQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['last_name_normalized', 'first_name_normalized'],
+                name='rsvp_guest_name_norm_idx',
+            ),
+            # Prefix (LIKE 'jo%') search in the admin. Pattern ops let
+            # Postgres use them whatever the database collation; other
+            # backends ignore opclasses.
+            models.Index(
+                fields=['first_name_normalized'],
+                name='rsvp_guest_first_norm_like',
+                opclasses=['varchar_pattern_ops'],
+            ),
+            models.Index(
+                fields=['last_name_normalized'],
+                name='rsvp_guest_last_norm_like',
+                opclasses=['varchar_pattern_ops'],
+            ),
+            models.Index(
+                fields=['email'],
+                name='rsvp_guest_email_like',
+                opclasses=['varchar_pattern_ops'],
+            ),
+        ]
+        constraints = [
+            # The guest list import upserts on this
+            models.UniqueConstraint(
+                fields=['group_id', 'last_name_normalized', 'first_name_normalized'],
+                name='rsvp_guest_group_name_uniq',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._counted = instance.counted_as()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._counted = self.counted_as()
+
+    def counted_as(self):
+        """(group_id, attending) as the RSVP counters see this guest."""
+        if not COUNTED_FIELDS <= self.__dict__.keys():
+            return _UNCOUNTED
+        return (self.group_id, self.attending)
+
+    def normalize_names(self):
+        self.first_name_normalized = normalize_name(self.first_name)
+        self.last_name_normalized = normalize_name(self.last_name)
+
+    def save(self, *args, **kwargs):
+        self.normalize_names()
+        self.email = normalize_email(self.email)
+        adding = self._state.adding
+        if not adding:
+            self.version += 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields) | {'version'}
+            if NAME_FIELDS & update_fields:
+                update_fields |= set(NORMALIZED_NAME_FIELDS)
+            kwargs['update_fields'] = update_fields
+        if update_fields is not None and not COUNTED_FIELDS & update_fields:
+            return super().save(*args, **kwargs)
+        counted = None if adding else getattr(self, '_counted', _UNCOUNTED)
+        current = self.counted_as()
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            RSVPCounter.objects.using(self._state.db).record_changes([(counted, current)])
+        self._counted = current
+
+
+class RSVPCounterQuerySet(models.QuerySet):
+
+    def record_changes(self, changes):
+        """Apply (before, after) pairs of Guest.counted_as() values to the counters.
+
+        ``before`` is None for a new guest and ``after`` None for a deleted
+        one. Each affected group's row is adjusted with a single F()
+        UPDATE; a group without a row yet gets one counted from scratch,
+        which already includes the change. Pairs where either side is
+        unknown are skipped (``recompute_rsvp_counters`` repairs those).
+        Call inside the transaction that wrote the guests.
+        """
+        deltas = {}
+        for before, after in changes:
+            if before is _UNCOUNTED or after is _UNCOUNTED or before == after:
+                continue
+            for counted, step in ((before, -1), (after, 1)):
+                if counted is not None:
+                    group_id, attending = counted
+                    column = RSVPCounter.COLUMNS[attending]
+                    group = deltas.setdefault(group_id, {})
+                    group[column] = group.get(column, 0) + step
+
+        missing = []
+        for group_id, group in deltas.items():
+            values = {column: F(column) + step for column, step in group.items() if step}
+            if values and not self.filter(group_id=group_id).update(**values):
+                missing.append(group_id)
+        if missing:
+            from .stats import recompute
+            recompute(missing, using=self.db)
+
+
+class RSVPCounter(models.Model):
+    """Denormalized attending / declined / pending counts for one guest group.
+
+    Kept current by every Guest write (see RSVPCounterQuerySet.record_changes)
+    so the RSVP dashboard never has to count guests.
+    """
+    # Guest.attending -> the column that counts it
+    COLUMNS = {True: 'attending', False: 'declined', None: 'pending'}
+
+    group_id = models.UUIDField(unique=True)
+    # Member names, for the dashboard; refreshed when the group is recounted
+    label = models.CharField(max_length=255, blank=True)
+    attending = models.IntegerField(default=0)
+    declined = models.IntegerField(default=0)
+    pending = models.IntegerField(default=0)
+
+    objects = RSVPCounterQuerySet.as_manager()
+
+    def __str__(self):
+        return self.label or str(self.group_id)
+
+    @property
+    def total(self):
+        return self.attending + self.declined + self.pending
+
+
+class RSVPSubmission(models.Model):
+    """Where an RSVP POST sent the guest, keyed by the form's idempotency token.
+
+    A replayed POST (double tap, browser retry) finds its receipt and is
+    redirected to the same place instead of writing again.
+    """
+    key = models.UUIDField(unique=True)
+    redirect_url = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.key} -> {self.redirect_url}"
+
+
+class OutboxEmail(models.Model):
+    """An RSVP email waiting to be sent (or already sent) by ``send_rsvp_emails``.
+
+    Requests only ever insert rows here; the worker sends due rows over
+    one SMTP connection per batch and reschedules failures with backoff.
+    """
+    CONFIRMATION = 'confirmation'
+    CHANGE = 'change'
+    KIND_CHOICES = [(CONFIRMATION, 'Confirmation'), (CHANGE, 'Change')]
+
+    PENDING = 'pending'
+    # Claimed by a worker; back to pending on failure, or claimable again
+    # once send_after passes if the worker died
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SENDING, 'Sending'), (SENT, 'Sent'), (FAILED, 'Failed')]
+
+    group_id = models.UUIDField(db_index=True)
+    to = models.EmailField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Earliest time the worker may (re)try; also its claim on rows it is sending
+    send_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'send_after'], name='rsvp_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} to {self.to} ({self.status})"
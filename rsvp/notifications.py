@@ -0,0 +1,185 @@
+"""
+RSVP confirmation emails, via a database outbox.
+
+The RSVP views call ``queue_rsvp_emails`` once a guest or household has
+answered. That renders the messages and inserts OutboxEmail rows, a few
+quick queries and no network. ``send_due_emails``, run by
+``manage.py send_rsvp_emails``, does the sending. It claims a batch of
+due rows, sends them over a single SMTP connection and reschedules the
+ones that fail with exponential backoff, up to
+``RSVP_EMAIL_MAX_ATTEMPTS`` tries, unless a newer answer has been queued
+for the same address in the meantime.
+
+Each address in a household gets one email covering every guest who
+gave it. The first one is a confirmation; later answers send a change
+notice. A message still waiting in the outbox is replaced by the newer
+answer rather than sent twice.
+"""
+
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+# Addresses made up for guests who never gave one
+PLACEHOLDER_DOMAIN = '@placeholder.com'
+SUBJECTS = {
+    OutboxEmail.CONFIRMATION: "Your RSVP for Kelly & John's wedding",
+    OutboxEmail.CHANGE: "Your updated RSVP for Kelly & John's wedding",
+}
+# First retry after a minute, doubling up to six hours
+RETRY_BASE = timedelta(minutes=1)
+RETRY_MAX = timedelta(hours=6)
+# How long a worker owns the rows it claimed before another may retry them
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def _addresses(guests):
+    """(group_id, address) -> guests who gave that address."""
+    recipients = {}
+    for guest in guests:
+        address = (guest.email or '').strip().lower()
+        if address and not address.endswith(PLACEHOLDER_DOMAIN):
+            recipients.setdefault((guest.group_id, address), []).append(guest)
+    return recipients
+
+
+def queue_rsvp_emails(guests):
+    """Queue a confirmation (or change notice) for each address among ``guests``.
+
+    Returns the number of emails queued.
+    """
+    recipients = _addresses(guests)
+    if not recipients:
+        return 0
+    group_ids = {group_id for group_id, _ in recipients}
+    addresses = {address for _, address in recipients}
+    with transaction.atomic():
+        earlier = OutboxEmail.objects.filter(group_id__in=group_ids, to__in=addresses)
+        # A message a worker is sending right now will most likely arrive first
+        confirmed = set(
+            earlier.filter(status__in=[OutboxEmail.SENT, OutboxEmail.SENDING]).values_list('group_id', 'to')
+        )
+        # This answer supersedes anything not yet claimed for sending
+        earlier.filter(status=OutboxEmail.PENDING).delete()
+        emails = []
+        for (group_id, address), household in recipients.items():
+            kind = OutboxEmail.CHANGE if (group_id, address) in confirmed else OutboxEmail.CONFIRMATION
+            emails.append(OutboxEmail(
+                group_id=group_id,
+                to=address,
+                kind=kind,
+                subject=SUBJECTS[kind],
+                body=render_to_string('rsvp/email/rsvp.txt', {'guests': household, 'kind': kind}),
+            ))
+        OutboxEmail.objects.bulk_create(emails)
+    return len(emails)
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+
+
+def _claim(batch_size):
+    """Mark up to ``batch_size`` due emails as sending, owned until the claim timeout.
+
+    Includes emails whose earlier claim timed out, from a worker that died.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=[OutboxEmail.PENDING, OutboxEmail.SENDING], send_after__lte=now)
+            .order_by('send_after', 'id')[:batch_size]
+        )
+        if batch:
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                status=OutboxEmail.SENDING, send_after=now + CLAIM_TIMEOUT,
+            )
+    return batch
+
+
+def _superseded(emails):
+    """Pks of ``emails`` with a newer email queued for the same household and address."""
+    if not emails:
+        return set()
+    latest = {}
+    for pk, group_id, address in OutboxEmail.objects.filter(
+        group_id__in={email.group_id for email in emails}, to__in={email.to for email in emails},
+    ).values_list('pk', 'group_id', 'to'):
+        latest[group_id, address] = max(pk, latest.get((group_id, address), pk))
+    return {email.pk for email in emails if latest.get((email.group_id, email.to), email.pk) > email.pk}
+
+
+def send_due_emails(batch_size=None, max_attempts=None):
+    """Send one batch of due emails over one connection.
+
+    Returns a Counter of sent / retried / failed / superseded. A failed
+    email that a newer answer has since replaced is deleted, not retried.
+    """
+    batch_size = batch_size or settings.RSVP_EMAIL_BATCH_SIZE
+    max_attempts = max_attempts or settings.RSVP_EMAIL_MAX_ATTEMPTS
+    stats = Counter()
+    batch = _claim(batch_size)
+    if not batch:
+        return stats
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        opened = False
+        error = exc
+    else:
+        opened = True
+    failures = []
+    try:
+        for email in batch:
+            if opened:
+                message = EmailMessage(email.subject, email.body, to=[email.to], connection=connection)
+                try:
+                    message.send()
+                except Exception as exc:
+                    error = exc
+                else:
+                    email.status = OutboxEmail.SENT
+                    email.sent_at = timezone.now()
+                    email.last_error = ''
+                    stats['sent'] += 1
+                    continue
+            email.attempts += 1
+            email.last_error = f"{type(error).__name__}: {error}"
+            failures.append(email)
+    finally:
+        if opened:
+            connection.close()
+        superseded = _superseded(failures)
+        for email in failures:
+            if email.pk in superseded:
+                stats['superseded'] += 1
+                logger.info("RSVP email %s to %s failed, dropped for a newer one: %s", email.pk, email.to, email.last_error)
+            elif email.attempts >= max_attempts:
+                email.status = OutboxEmail.FAILED
+                stats['failed'] += 1
+                logger.error("Giving up on RSVP email %s to %s: %s", email.pk, email.to, email.last_error)
+            else:
+                email.status = OutboxEmail.PENDING
+                email.send_after = timezone.now() + retry_delay(email.attempts)
+                stats['retried'] += 1
+                logger.warning("RSVP email %s to %s failed, will retry: %s", email.pk, email.to, email.last_error)
+        if superseded:
+            OutboxEmail.objects.filter(pk__in=superseded).delete()
+        OutboxEmail.objects.bulk_update(
+            [email for email in batch if email.pk not in superseded],
+            ['status', 'attempts', 'send_after', 'last_error', 'sent_at'],
+        )
+    return stats
@@ -0,0 +1,260 @@
+"""
+Typo-tolerant guest name search.
+
+The default backend keeps an in-memory trigram index of every guest's
+normalized first and last name. It is built lazily on first use, patched
+in place when a guest is saved or deleted in this process, and rebuilt
+after ``RSVP_GUEST_SEARCH_TTL`` seconds so other workers' writes show up.
+Scoring follows pg_trgm: the similarity of two strings is the number of
+shared trigrams divided by the size of the union of their trigram sets.
+
+Set ``RSVP_GUEST_SEARCH_BACKEND = 'postgres'`` to push the search into
+Postgres with ``pg_trgm`` instead (migration 0013 installs the
+extension). Both backends apply the same minimum length and prefix rules.
+"""
+
+import threading
+import time
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Guest, guests_bulk_changed, normalize_name
+
+
+def mask_email(email):
+    """``kelly@gmail.com`` -> ``k•••@g•••.com``: enough to tell two guests apart."""
+    local, _, domain = (email or '').partition('@')
+    if not local or not domain:
+        return ''
+    host, dot, tld = domain.rpartition('.')
+    if not dot:
+        host, tld = domain, ''
+    return f"{local[0]}•••@{host[:1]}•••{dot}{tld}"
+
+
+class GuestMatch(namedtuple('GuestMatch', 'id first_name last_name email group_id score')):
+    __slots__ = ()
+
+    @property
+    def email_hint(self):
+        return mask_email(self.email)
+
+
+# Candidates scoring below this are not worth showing (pg_trgm's default)
+DEFAULT_THRESHOLD = 0.3
+DEFAULT_LIMIT = 5
+# Suggestions are shown to anyone, so a couple of initials must not list guests
+MIN_NAME_LENGTH = 2
+# The prefix bonus ("Jon" for "Jonathan") needs a real first name and a close surname
+PREFIX_MIN_LENGTH = 3
+PREFIX_SURNAME_SIMILARITY = 0.5
+
+INDEXED_FIELDS = {'first_name', 'last_name', 'email', 'group_id'}
+
+
+def too_short(first_norm, last_norm):
+    return min(len(first_norm), len(last_norm)) < MIN_NAME_LENGTH
+
+
+def trigrams(value):
+    """Trigram set of a normalized name, padded like pg_trgm ("  jon ")."""
+    if not value:
+        return frozenset()
+    padded = f"  {value} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    """Inverted trigram index over guest first and last names."""
+
+    def __init__(self):
+        self._guests = {}
+        self._grams = {}
+        self._postings = ({}, {})
+
+    def __len__(self):
+        return len(self._guests)
+
+    def add(self, guest):
+        self.remove(guest.pk)
+        first = trigrams(normalize_name(guest.first_name))
+        last = trigrams(normalize_name(guest.last_name))
+        self._guests[guest.pk] = (guest.first_name, guest.last_name, guest.email, guest.group_id)
+        self._grams[guest.pk] = (first, last)
+        for postings, grams in zip(self._postings, (first, last)):
+            for gram in grams:
+                postings.setdefault(gram, set()).add(guest.pk)
+
+    def remove(self, pk):
+        if pk not in self._guests:
+            return
+        del self._guests[pk]
+        for postings, grams in zip(self._postings, self._grams.pop(pk)):
+            for gram in grams:
+                ids = postings[gram]
+                ids.discard(pk)
+                if not ids:
+                    del postings[gram]
+
+    def search(self, first_name, last_name, limit=DEFAULT_LIMIT, threshold=DEFAULT_THRESHOLD):
+        """Return up to ``limit`` GuestMatch tuples, best first."""
+        first_norm = normalize_name(first_name)
+        last_norm = normalize_name(last_name)
+        if too_short(first_norm, last_norm):
+            return []
+        query = (trigrams(first_norm), trigrams(last_norm))
+
+        overlaps = (Counter(), Counter())
+        for postings, grams, counts in zip(self._postings, query, overlaps):
+            for gram in grams:
+                counts.update(postings.get(gram, ()))
+
+        matches = []
+        for pk in overlaps[0].keys() | overlaps[1].keys():
+            scores = []
+            for query_grams, guest_grams, counts in zip(query, self._grams[pk], overlaps):
+                shared = counts[pk]
+                union = len(query_grams) + len(guest_grams) - shared
+                scores.append(shared / union if union else 0.0)
+            score = sum(scores) / 2
+            first, last, email, group_id = self._guests[pk]
+            # "Jon" should still find "Jonathan" when the surname agrees
+            if (
+                len(first_norm) >= PREFIX_MIN_LENGTH
+                and scores[1] >= PREFIX_SURNAME_SIMILARITY
+                and normalize_name(first).startswith(first_norm)
+            ):
+                score = max(score, (1 + scores[1]) / 2 * 0.9)
+            if score >= threshold:
+                matches.append(GuestMatch(pk, first, last, email, group_id, round(score, 3)))
+
+        matches.sort(key=lambda m: (-m.score, m.last_name, m.first_name, m.id))
+        return matches[:limit]
+
+
+class InMemoryBackend:
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._index = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def _get_index(self):
+        with self._lock:
+            stale = self.ttl is not None and time.monotonic() - self._built_at > self.ttl
+            if self._index is None or stale:
+                index = TrigramIndex()
+                for guest in Guest.objects.only('first_name', 'last_name', 'email', 'group_id').iterator():
+                    index.add(guest)
+                self._index = index
+                self._built_at = time.monotonic()
+            return self._index
+
+    def search(self, first_name, last_name, limit=DEFAULT_LIMIT, threshold=DEFAULT_THRESHOLD):
+        return self._get_index().search(first_name, last_name, limit, threshold)
+
+    def update(self, guest):
+        with self._lock:
+            if self._index is not None:
+                self._index.add(guest)
+
+    def remove(self, pk):
+        with self._lock:
+            if self._index is not None:
+                self._index.remove(pk)
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+
+
+class PostgresTrigramBackend:
+    """Delegates scoring to pg_trgm; nothing is kept in process memory."""
+
+    def search(self, first_name, last_name, limit=DEFAULT_LIMIT, threshold=DEFAULT_THRESHOLD):
+        from django.contrib.postgres.search import TrigramSimilarity
+        from django.db.models import Case, F, Value, When
+        from django.db.models.functions import Greatest
+
+        first_norm = normalize_name(first_name)
+        last_norm = normalize_name(last_name)
+        if too_short(first_norm, last_norm):
+            return []
+        guests = Guest.objects.annotate(
+            first_score=TrigramSimilarity('first_name_normalized', first_norm),
+            last_score=TrigramSimilarity('last_name_normalized', last_norm),
+        )
+        score = (F('first_score') + F('last_score')) / 2
+        # The same prefix bonus as TrigramIndex.search
+        if len(first_norm) >= PREFIX_MIN_LENGTH:
+            score = Case(
+                When(
+                    first_name_normalized__startswith=first_norm,
+                    last_score__gte=PREFIX_SURNAME_SIMILARITY,
+                    then=Greatest(score, (Value(1.0) + F('last_score')) / 2 * Value(0.9)),
+                ),
+                default=score,
+            )
+        rows = (
+            guests.annotate(score=score)
+            .filter(score__gte=threshold)
+            .order_by('-score', 'last_name', 'first_name', 'id')
+            .values_list('id', 'first_name', 'last_name', 'email', 'group_id', 'score')[:limit]
+        )
+        return [GuestMatch(*row[:5], round(row[5], 3)) for row in rows]
+
+    def update(self, guest):
+        pass
+
+    def remove(self, pk):
+        pass
+
+    def invalidate(self):
+        pass
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = getattr(settings, 'RSVP_GUEST_SEARCH_BACKEND', 'memory')
+                if name == 'postgres':
+                    _backend = PostgresTrigramBackend()
+                else:
+                    _backend = InMemoryBackend(ttl=getattr(settings, 'RSVP_GUEST_SEARCH_TTL', 300))
+    return _backend
+
+
+def search_guests(first_name, last_name, limit=DEFAULT_LIMIT, threshold=DEFAULT_THRESHOLD):
+    """Ranked fuzzy matches for a name that had no exact match."""
+    return get_backend().search(first_name, last_name, limit, threshold)
+
+
+@receiver(post_save, sender=Guest)
+def _guest_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or INDEXED_FIELDS & set(update_fields):
+        get_backend().update(instance)
+
+
+@receiver(post_delete, sender=Guest)
+def _guest_deleted(sender, instance, **kwargs):
+    get_backend().remove(instance.pk)
+
+
+@receiver(guests_bulk_changed, sender=Guest)
+def _guests_bulk_changed(sender, fields=None, objs=None, **kwargs):
+    if fields is not None and not INDEXED_FIELDS & set(fields):
+        return
+    if objs is not None and all(obj.pk for obj in objs):
+        for obj in objs:
+            get_backend().update(obj)
+    else:
+        get_backend().invalidate()
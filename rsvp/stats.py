@@ -0,0 +1,118 @@
+"""
+RSVP counts for the admin dashboard.
+
+Counting guests by ``attending`` on every dashboard load means scanning
+the guest table each time. Instead each group has an RSVPCounter row
+that guest writes adjust in the same transaction: the RSVP views'
+versioned updates and ``Guest.save`` apply F() deltas, deletes are
+handled below, and bulk writes (the guest import, queryset updates)
+recount the groups they touched. ``recompute`` rebuilds the rows from
+the guest table; ``manage.py recompute_rsvp_counters`` runs it to repair
+any drift.
+"""
+
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import COUNTED_FIELDS, Guest, RSVPCounter, guests_bulk_changed
+
+# Longest label kept on a counter row (RSVPCounter.label's max_length)
+LABEL_LENGTH = 255
+
+RSVPTotals = namedtuple('RSVPTotals', 'attending declined pending total groups')
+RSVPDashboard = namedtuple('RSVPDashboard', 'totals groups')
+
+
+def _label(names):
+    label = ', '.join(f"{first} {last}" for first, last in names)
+    return label if len(label) <= LABEL_LENGTH else label[:LABEL_LENGTH - 1] + '…'
+
+
+def recompute(group_ids=None, using='default'):
+    """Recount ``group_ids`` (every group if None) from the guest table.
+
+    Returns how many counter rows were wrong, missing or left over.
+    """
+    guests = Guest.objects.using(using)
+    counters = RSVPCounter.objects.using(using)
+    if group_ids is not None:
+        group_ids = set(group_ids)
+        guests = guests.filter(group_id__in=group_ids)
+        counters = counters.filter(group_id__in=group_ids)
+
+    with transaction.atomic(using=using):
+        # Lock the rows before counting: a guest write that commits first
+        # is in the count, and one that doesn't waits to add its delta on top
+        current = {
+            counter.group_id: (counter.attending, counter.declined, counter.pending)
+            for counter in counters.select_for_update()
+        }
+
+        # One pass over the guests gives both the counts and the labels
+        fresh = {}
+        members = {}
+        rows = guests.order_by('id').values_list('group_id', 'first_name', 'last_name', 'attending')
+        for group_id, first, last, attending in rows.iterator():
+            counter = fresh.get(group_id)
+            if counter is None:
+                counter = fresh[group_id] = RSVPCounter(group_id=group_id)
+            column = RSVPCounter.COLUMNS[attending]
+            setattr(counter, column, getattr(counter, column) + 1)
+            members.setdefault(group_id, []).append((first, last))
+        for group_id, counter in fresh.items():
+            counter.label = _label(members[group_id])
+
+        stale = current.keys() - fresh.keys()
+        if stale:
+            counters.filter(group_id__in=stale).delete()
+        if fresh:
+            counters.bulk_create(
+                fresh.values(),
+                update_conflicts=True,
+                unique_fields=['group_id'],
+                update_fields=['label', 'attending', 'declined', 'pending'],
+            )
+    wrong = sum(
+        1 for group_id, counter in fresh.items()
+        if current.get(group_id) != (counter.attending, counter.declined, counter.pending)
+    )
+    return wrong + len(stale)
+
+
+def dashboard():
+    """Overall and per-group RSVP counts, read from the counter rows alone."""
+    # Rows of groups whose guests were all deleted linger at zero until recomputed
+    groups = [group for group in RSVPCounter.objects.order_by('-pending', 'label') if group.total]
+    attending = sum(group.attending for group in groups)
+    declined = sum(group.declined for group in groups)
+    pending = sum(group.pending for group in groups)
+    return RSVPDashboard(
+        totals=RSVPTotals(attending, declined, pending, attending + declined + pending, len(groups)),
+        groups=groups,
+    )
+
+
+@receiver(post_delete, sender=Guest)
+def _guest_deleted(sender, instance, using, **kwargs):
+    # Sent inside the delete's transaction, for queryset deletes too
+    RSVPCounter.objects.using(using).record_changes([(getattr(instance, '_counted', None), None)])
+
+
+@receiver(guests_bulk_changed, sender=Guest)
+def _guests_bulk_changed(sender, fields, objs, counted=False, group_ids=None, **kwargs):
+    if counted or (fields is not None and not COUNTED_FIELDS & set(fields)):
+        return
+    if objs is None:
+        # A queryset update(), which collected its groups if it could
+        recompute(group_ids)
+        return
+    if fields is not None and 'group_id' in fields:
+        # Can't tell which groups the instances left
+        recompute()
+        return
+    recompute({obj.group_id for obj in objs})
+    for obj in objs:
+        obj._counted = obj.counted_as()
@@ -1,3 +1,702 @@
-from django.test import TestCase
+import json
+import os
+import smtplib
+import tempfile
+import uuid
+from io import StringIO
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.management import CommandError, call_command
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .importer import HOUSEHOLD_NAMESPACE
+from .models import Guest, GuestVersionConflict, OutboxEmail, RSVPCounter, RSVPSubmission, normalize_name
+from .notifications import _claim, send_due_emails
+from .search import PostgresTrigramBackend, TrigramIndex, get_backend, search_guests
+from .stats import dashboard, recompute
+
+
+class NormalizedNameTests(TestCase):
+    def test_normalize_name_folds_case_accents_and_whitespace(self):
+        self.assertEqual(normalize_name('  José '), 'jose')
+        self.assertEqual(normalize_name('Mc Donald'), 'mcdonald')
+        self.assertEqual(normalize_name('STRASSE'), normalize_name('straße'))
+        self.assertEqual(normalize_name(None), '')
+
+    def test_save_populates_normalized_columns(self):
+        guest = Guest.objects.create(first_name='Zoë', last_name='Smith', email='z@example.com')
+        self.assertEqual(guest.first_name_normalized, 'zoe')
+
+        guest.first_name = 'Chloé'
+        guest.save(update_fields=['first_name'])
+        guest.refresh_from_db()
+        self.assertEqual(guest.first_name_normalized, 'chloe')
+
+    def test_bulk_writes_populate_normalized_columns(self):
+        Guest.objects.bulk_create([
+            Guest(first_name='Ana', last_name='Núñez', email='a@example.com'),
+        ])
+        guest = Guest.objects.get()
+        self.assertEqual(guest.last_name_normalized, 'nunez')
+
+        guest.last_name = 'Peña'
+        Guest.objects.bulk_update([guest], ['last_name'])
+        self.assertEqual(Guest.objects.get().last_name_normalized, 'pena')
+
+        Guest.objects.update(last_name='Ortiz')
+        self.assertEqual(Guest.objects.get().last_name_normalized, 'ortiz')
+
+
+class RSVPEntryPointTests(TestCase):
+    def setUp(self):
+        get_backend().invalidate()
+        self.guest = Guest.objects.create(first_name='Kelly', last_name='Throckmorton', email='k@example.com')
+
+    def test_lookup_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('rsvp'), {'first_name': ' KELLY ', 'last_name': 'throckmorton'})
+        self.assertTemplateUsed(response, 'rsvp/confirm_guest.html')
+        self.assertEqual(response.context['guest'], self.guest)
+
+    def test_lookup_multiple_matches(self):
+        Guest.objects.create(first_name='Kelly', last_name='Throckmorton', email='k2@example.com')
+        response = self.client.post(reverse('rsvp'), {'first_name': 'Kelly', 'last_name': 'Throckmorton'})
+        self.assertTemplateUsed(response, 'rsvp/select_guest.html')
+        self.assertEqual(len(response.context['matches']), 2)
+
+    def test_lookup_not_found(self):
+        response = self.client.post(reverse('rsvp'), {'first_name': 'Nobody', 'last_name': 'Here'})
+        self.assertTemplateUsed(response, 'rsvp/not_found.html')
+
+
+class GuestSearchTests(TestCase):
+    def setUp(self):
+        get_backend().invalidate()
+        self.jonathan = Guest.objects.create(first_name='Jonathan', last_name='McDonald', email='j@example.com')
+        self.kelly = Guest.objects.create(first_name='Kelly', last_name='Throckmorton', email='k@example.com')
+
+    def test_index_ranks_typos_and_prefixes(self):
+        index = TrigramIndex()
+        index.add(self.jonathan)
+        index.add(self.kelly)
+        self.assertEqual([m.id for m in index.search('Jon', 'McDonald ')], [self.jonathan.id])
+        self.assertEqual([m.id for m in index.search('Kely', 'Throckmortn')], [self.kelly.id])
+        self.assertEqual(index.search('Zed', 'Zimmerman'), [])
+
+        index.remove(self.kelly.pk)
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.search('Kely', 'Throckmortn'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        search_guests('Jon', 'McDonald')  # build the index
+        guest = Guest.objects.create(first_name='Priya', last_name='Raman', email='p@example.com')
+        self.assertEqual(search_guests('Pria', 'Raman')[0].id, guest.id)
+
+        with self.assertNumQueries(0):
+            search_guests('Pria', 'Raman')
+
+        guest.delete()
+        self.assertEqual(search_guests('Pria', 'Raman'), [])
+
+    def test_postgres_backend_matches_the_index(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest('pg_trgm needs PostgreSQL')
+        for first, last in [('Jonah', 'McDonald'), ('Jo', 'McDonnell'), ('Kelli', 'Throckmorten'), ('Ana', 'Lopez')]:
+            Guest.objects.create(first_name=first, last_name=last, email=f'{first.lower()}@example.com')
+        index = TrigramIndex()
+        for guest in Guest.objects.all():
+            index.add(guest)
+        postgres = PostgresTrigramBackend()
+        for first, last in [('Jon', 'McDonald'), ('Jo', 'McDonald'), ('Kely', 'Throckmortn'), ('Jonat', 'MacDonald')]:
+            expected = index.search(first, last)
+            found = postgres.search(first, last)
+            self.assertTrue(expected)
+            self.assertEqual([m.id for m in found], [m.id for m in expected], (first, last))
+            for match, want in zip(found, expected):
+                self.assertAlmostEqual(match.score, want.score, places=2)
+        with self.assertNumQueries(0):
+            self.assertEqual(postgres.search('J', 'McDonald'), [])
+
+    def test_entry_point_offers_suggestions(self):
+        response = self.client.post(reverse('rsvp'), {'first_name': 'Jon', 'last_name': 'McDonald'})
+        self.assertTemplateUsed(response, 'rsvp/select_guest.html')
+        self.assertTrue(response.context['suggested'])
+        self.assertContains(response, reverse('confirm_guest', args=[self.jonathan.id]))
+        self.assertNotContains(response, 'j@example.com')
+        self.assertContains(response, 'j•••@e•••.com')
+
+    def test_initials_do_not_list_guests(self):
+        Guest.objects.create(first_name='Jane', last_name='Mills', email='jane@example.com')
+        self.assertEqual(search_guests('J', 'M'), [])
+        self.assertEqual(search_guests('J', 'McDonald'), [])
+        # A short prefix with a barely similar surname gets no bonus
+        self.assertEqual(search_guests('Jo', 'Mc'), [])
+        self.assertEqual([m.id for m in search_guests('Jon', 'Macdonald')], [self.jonathan.id])
+
+
+class GroupRSVPWriteTests(TestCase):
+    def make_group(self, size):
+        group_id = uuid.uuid4()
+        Guest.objects.bulk_create([
+            Guest(group_id=group_id, first_name=f'Guest{i}', last_name='Family', email=f'g{i}@example.com')
+            for i in range(size)
+        ])
+        return group_id, list(Guest.objects.filter(group_id=group_id).order_by('id'))
+
+    def post_attendance(self, group_id, guests):
+        data = {f'attending_{g.id}': 'yes' if i % 2 == 0 else 'no' for i, g in enumerate(guests)}
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('confirm_group_attendance', args=[group_id]), data)
+        self.assertRedirects(response, reverse('group_rsvp_questions', args=[group_id]), fetch_redirect_response=False)
+        return len(ctx.captured_queries)
+
+    def test_confirm_group_attendance_query_count_is_constant(self):
+        small = self.post_attendance(*self.make_group(2))
+        large = self.post_attendance(*self.make_group(8))
+        self.assertEqual(small, large)
+
+        group_id, guests = self.make_group(3)
+        with self.assertNumQueries(5):  # select, savepoint, bulk update, counter update, release
+            self.client.post(reverse('confirm_group_attendance', args=[group_id]), {
+                f'attending_{g.id}': 'yes' for g in guests
+            })
+        self.assertEqual(Guest.objects.filter(group_id=group_id, attending=True).count(), 3)
+
+    def test_unchanged_group_skips_the_update(self):
+        group_id, guests = self.make_group(3)
+        Guest.objects.filter(group_id=group_id).update(attending=True)
+        with self.assertNumQueries(1):  # the group select; no UPDATE
+            self.client.post(reverse('confirm_group_attendance', args=[group_id]), {
+                f'attending_{g.id}': 'yes' for g in guests
+            })
+
+    def test_group_pages_fetch_the_group_once(self):
+        group_id, guests = self.make_group(4)
+        Guest.objects.filter(pk__in=[g.pk for g in guests[:2]]).update(attending=True)
+        Guest.objects.filter(pk__in=[g.pk for g in guests[2:]]).update(attending=False)
+        for name in ('group_rsvp_questions', 'group_declined', 'group_thank_you'):
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse(name, args=[group_id]))
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['guests']), 4)
+
+    def test_group_declined_saves_contact_info(self):
+        group_id, guests = self.make_group(2)
+        Guest.objects.filter(group_id=group_id).update(attending=False)
+        self.client.post(reverse('group_declined', args=[group_id]), {
+            f'email_{guests[0].id}': 'new@example.com',
+            f'message_{guests[1].id}': 'Congratulations!',
+        })
+        guests[0].refresh_from_db()
+        guests[1].refresh_from_db()
+        self.assertEqual(guests[0].email, 'new@example.com')
+        self.assertEqual(guests[1].message_for_couple, 'Congratulations!')
+
+
+class ConcurrentRSVPTests(TestCase):
+    def setUp(self):
+        self.group_id = uuid.uuid4()
+        self.kelly = Guest.objects.create(group_id=self.group_id, first_name='Kelly', last_name='T', email='k@example.com')
+        self.john = Guest.objects.create(group_id=self.group_id, first_name='John', last_name='S', email='j@example.com')
+
+    def test_versioned_update_rejects_stale_instances(self):
+        stale = Guest.objects.get(pk=self.kelly.pk)
+        fresh = Guest.objects.get(pk=self.kelly.pk)
+        fresh.attending = True
+        Guest.objects.bulk_update_versioned([fresh], ['attending'])
+        self.assertEqual(fresh.version, 1)
+
+        stale.attending = False
+        john = Guest.objects.get(pk=self.john.pk)
+        john.attending = False
+        with self.assertRaises(GuestVersionConflict):
+            Guest.objects.bulk_update_versioned([stale, john], ['attending'])
+        # Nothing was written for either guest
+        self.assertTrue(Guest.objects.get(pk=self.kelly.pk).attending)
+        self.assertIsNone(Guest.objects.get(pk=self.john.pk).attending)
+
+    def test_group_submission_with_stale_versions_is_rejected(self):
+        url = reverse('confirm_group_attendance', args=[self.group_id])
+        form_versions = {f'version_{g.id}': g.version for g in (self.kelly, self.john)}
+        self.kelly.attending = True
+        self.kelly.save()  # another phone got there first
+
+        response = self.client.post(url, {
+            **form_versions,
+            f'attending_{self.kelly.id}': 'no',
+            f'attending_{self.john.id}': 'no',
+        })
+        self.assertTemplateUsed(response, 'rsvp/group_confirm.html')
+        self.assertContains(response, 'Someone else in your party')
+        self.assertTrue(Guest.objects.get(pk=self.kelly.pk).attending)
+        self.assertIsNone(Guest.objects.get(pk=self.john.pk).attending)
+
+    def test_replayed_post_is_answered_from_the_receipt(self):
+        url = reverse('confirm_group_attendance', args=[self.group_id])
+        data = {
+            'idempotency_key': str(uuid.uuid4()),
+            f'attending_{self.kelly.id}': 'yes',
+            f'attending_{self.john.id}': 'no',
+        }
+        first = self.client.post(url, data)
+        with self.assertNumQueries(2):  # group select, receipt lookup
+            replay = self.client.post(url, {**data, f'attending_{self.kelly.id}': 'no'})
+        self.assertEqual(first.url, replay.url)
+        self.assertEqual(RSVPSubmission.objects.count(), 1)
+        self.assertTrue(Guest.objects.get(pk=self.kelly.pk).attending)
+
+    def test_single_guest_confirm_is_idempotent(self):
+        url = reverse('rsvp_confirm_attendance', args=[self.kelly.id])
+        key = self.client.get(url).context['idempotency_key']
+        data = {'idempotency_key': str(key), 'version': self.kelly.version, 'attending': 'yes'}
+        self.assertRedirects(self.client.post(url, data), reverse('rsvp_questions_yes', args=[self.kelly.id]), fetch_redirect_response=False)
+        replay = self.client.post(url, {**data, 'attending': 'no'})
+        self.assertEqual(replay.url, reverse('rsvp_questions_yes', args=[self.kelly.id]))
+        self.assertEqual(Guest.objects.get(pk=self.kelly.pk).version, 1)
+
+
+class ImportGuestsTests(TestCase):
+    HEADER = 'Household,First Name,Last Name,Email,Dietary Restrictions\n'
+
+    def write_csv(self, body, header=HEADER):
+        tmp = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8')
+        self.addCleanup(os.remove, tmp.name)
+        with tmp:
+            tmp.write(header + body)
+        return tmp.name
+
+    def import_csv(self, path, *args):
+        out = StringIO()
+        call_command('import_guests', path, *args, stdout=out, stderr=StringIO(), verbosity=2)
+        return out.getvalue()
+
+    def test_import_groups_households_and_reimport_only_writes_changes(self):
+        path = self.write_csv(
+            'The Smiths,Ann,Smith,ann@example.com,\n'
+            'The Smiths,Bob,Smith,bob@example.com,vegan\n'
+            'Lee,Joy,Lee,joy@example.com,\n'
+        )
+        self.assertIn('3 created', self.import_csv(path))
+        ann, bob = Guest.objects.filter(last_name='Smith').order_by('first_name')
+        self.assertEqual(ann.group_id, bob.group_id)
+        self.assertEqual(ann.group_id, uuid.uuid5(HOUSEHOLD_NAMESPACE, 'thesmiths'))
+        self.assertEqual(bob.dietary_restrictions, 'vegan')
+
+        ann.attending = True
+        ann.save()
+        changed = self.write_csv(
+            'The Smiths,Ann,Smith,ann@new.example.com,\n'
+            'The Smiths,Bob,Smith,bob@example.com,vegan\n'
+            'Lee,Joy,Lee,joy@example.com,\n'
+        )
+        # SELECT, savepoint, upsert, then the touched groups' recount (select, savepoint,
+        # counter select, counter upsert, release), release
+        with self.assertNumQueries(9):
+            output = self.import_csv(changed, '--batch-size', '10')
+        self.assertIn("1 updated, 2 unchanged", output)
+        self.assertIn("email: 'ann@example.com' -> 'ann@new.example.com'", output)
+        ann.refresh_from_db()
+        self.assertEqual(ann.email, 'ann@new.example.com')
+        self.assertTrue(ann.attending)
+        self.assertEqual(Guest.objects.count(), 3)
+
+    def test_reimporting_a_mixed_case_email_is_unchanged(self):
+        path = self.write_csv('Lee,Joy,Lee,Joy.Lee@Example.com,\n')
+        self.assertIn('1 created', self.import_csv(path))
+        joy = Guest.objects.get()
+        self.assertEqual(joy.email, 'joy.lee@example.com')
+        self.assertIn('0 updated, 1 unchanged', self.import_csv(path))
+        self.assertEqual(Guest.objects.get().version, joy.version)
+
+    def test_households_join_existing_groups(self):
+        existing = Guest.objects.create(first_name='José', last_name='Ruiz', email='j@example.com')
+        path = self.write_csv(
+            'Ruiz family,jose,RUIZ,j@example.com,\n'
+            'Ruiz family,Maria,Ruiz,m@example.com,\n'
+        )
+        output = self.import_csv(path, '--batch-size', '1')
+        self.assertIn('1 created', output)
+        self.assertIn("first_name: 'José' -> 'jose'", output)
+        self.assertEqual(Guest.objects.filter(group_id=existing.group_id).count(), 2)
+
+    def test_namesakes_in_other_households_are_left_alone(self):
+        path = self.write_csv(
+            'The Smiths,John,Smith,john@example.com,\n'
+            'The Smiths,Ann,Smith,ann@example.com,\n'
+        )
+        self.import_csv(path)
+        smiths = uuid.uuid5(HOUSEHOLD_NAMESPACE, 'thesmiths')
+        # A different John Smith, in his own household
+        output = self.import_csv(self.write_csv('John Smith,John,Smith,js@example.com,vegan\n'))
+        self.assertIn('1 created', output)
+        self.assertEqual(Guest.objects.get(group_id=smiths, first_name='John').email, 'john@example.com')
+        self.assertEqual(Guest.objects.get(email='js@example.com').group_id, uuid.uuid5(HOUSEHOLD_NAMESPACE, 'johnsmith'))
+
+        # Ambiguous: the name is in two existing groups
+        Guest.objects.create(first_name='Ann', last_name='Smith', email='other-ann@example.com')
+        self.import_csv(self.write_csv('Ann Smith,Ann,Smith,ann2@example.com,\n'))
+        self.assertEqual(Guest.objects.get(email='ann2@example.com').group_id, uuid.uuid5(HOUSEHOLD_NAMESPACE, 'annsmith'))
+
+    def test_dry_run_and_bad_rows(self):
+        path = self.write_csv(
+            'Lee,Joy,Lee,joy@example.com,\n'
+            'Lee,,Lee,x@example.com,\n'
+            'Lee,Joy,Lee,again@example.com,\n'
+        )
+        output = self.import_csv(path, '--dry-run')
+        self.assertIn('Dry run, nothing written: 1 created, 0 updated, 0 unchanged, 2 skipped', output)
+        self.assertFalse(Guest.objects.exists())
+
+        with self.assertRaisesMessage(CommandError, 'Missing column(s): household'):
+            self.import_csv(self.write_csv('Joy,Lee,joy@example.com\n', header='First Name,Last Name,Email\n'))
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        group = uuid.uuid4()
+        Guest.objects.bulk_create([
+            Guest(group_id=group, first_name='Ann', last_name='Smith', email='a@example.com',
+                  attending=True, dietary_restrictions=' Vegan'),
+            Guest(group_id=group, first_name='Bob', last_name='Smith', email='b@example.com',
+                  attending=True, dietary_restrictions='vegan '),
+            Guest(first_name='Cy', last_name='Young', email='c@example.com',
+                  attending=True, dietary_restrictions='None', message_for_couple='Congrats, "you two"'),
+            Guest(first_name='Di', last_name='Xu', email='d@example.com',
+                  attending=False, dietary_restrictions='Gluten free'),
+            Guest(first_name='Ed', last_name='Wu', email='e@example.com'),
+        ])
+        self.staff = User.objects.create_user('planner', password='pw', is_staff=True)
+
+    def test_exports_are_staff_only_and_streamed(self):
+        url = reverse('export_guests', args=['csv'])
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'group_id,first_name,last_name,email,attending,dietary_restrictions,message_for_couple')
+        self.assertEqual(len(lines), 6)
+        self.assertIn('"Congrats, ""you two"""', lines[-1])
+
+        data = json.loads(b''.join(self.client.get(reverse('export_guests', args=['json'])).streaming_content))
+        self.assertEqual([row['first_name'] for row in data], ['Ann', 'Bob', 'Ed', 'Di', 'Cy'])
+        self.assertIsNone(data[2]['attending'])
+        self.assertEqual(self.client.get(reverse('export_guests', args=['xml'])).status_code, 404)
+
+    def test_caterer_report_aggregates_in_the_database(self):
+        self.client.force_login(self.staff)
+        with self.assertNumQueries(4):  # session, user, headcounts, dietary
+            report = self.client.get(reverse('caterer_report', args=['json'])).json()
+        self.assertEqual((report['attending'], report['declined'], report['pending'], report['total']), (3, 1, 1, 5))
+        self.assertEqual(report['dietary'], [{'restriction': 'vegan', 'count': 2}])
+
+        csv_report = self.client.get(reverse('caterer_report', args=['csv'])).content.decode()
+        self.assertIn('dietary,vegan,2', csv_report)
+
+    def test_admin_actions(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        response = self.client.post(reverse('admin:rsvp_guest_changelist'), {
+            'action': 'export_csv',
+            '_selected_action': list(Guest.objects.filter(last_name='Smith').values_list('pk', flat=True)),
+        })
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 3)
+
+
+class RSVPCounterTests(TestCase):
+    def setUp(self):
+        self.group_id = uuid.uuid4()
+        Guest.objects.bulk_create([
+            Guest(group_id=self.group_id, first_name=name, last_name='Family', email=f'{name}@example.com')
+            for name in ('Ann', 'Bob', 'Cy')
+        ])
+        self.guests = list(Guest.objects.filter(group_id=self.group_id).order_by('id'))
+
+    def counts(self, group_id=None):
+        counter = RSVPCounter.objects.get(group_id=group_id or self.group_id)
+        return counter.attending, counter.declined, counter.pending
+
+    def test_rsvp_views_keep_counters_in_step(self):
+        self.assertEqual(self.counts(), (0, 0, 3))
+        self.assertEqual(RSVPCounter.objects.get(group_id=self.group_id).label, 'Ann Family, Bob Family, Cy Family')
+
+        self.client.post(reverse('confirm_group_attendance', args=[self.group_id]), {
+            f'attending_{self.guests[0].id}': 'yes',
+            f'attending_{self.guests[1].id}': 'no',
+        })
+        self.assertEqual(self.counts(), (1, 1, 1))
+
+        cy = self.guests[2]
+        self.client.post(reverse('rsvp_confirm_attendance', args=[cy.id]), {'attending': 'yes', 'version': cy.version})
+        self.client.post(reverse('rsvp_confirm_attendance', args=[cy.id]), {'attending': 'no', 'version': cy.version + 1})
+        self.assertEqual(self.counts(), (1, 2, 0))
+
+        # A stale form is rejected and leaves the counters alone
+        self.client.post(reverse('rsvp_confirm_attendance', args=[cy.id]), {'attending': 'yes', 'version': cy.version})
+        self.assertEqual(self.counts(), (1, 2, 0))
+
+    def test_saves_deletes_and_bulk_writes_are_counted(self):
+        other = Guest.objects.create(first_name='Di', last_name='Solo', email='di@example.com', attending=True)
+        self.assertEqual(self.counts(other.group_id), (1, 0, 0))
+
+        other.group_id = self.group_id
+        other.save()
+        self.assertEqual(self.counts(), (1, 0, 3))
+        self.assertEqual(self.counts(other.group_id), (1, 0, 3))
+        self.assertEqual(len(dashboard().groups), 1)
+
+        Guest.objects.filter(pk__in=[self.guests[0].pk, self.guests[1].pk]).update(attending=False)
+        self.assertEqual(self.counts(), (1, 2, 1))
+        Guest.objects.filter(first_name='Cy').delete()
+        self.assertEqual(self.counts(), (1, 2, 0))
+
+    def test_queryset_updates_recount_only_the_groups_they_touch(self):
+        other = Guest.objects.create(first_name='Di', last_name='Solo', email='di@example.com')
+        RSVPCounter.objects.filter(group_id=other.group_id).update(pending=7)  # drift elsewhere
+        Guest.objects.filter(first_name='Ann').update(attending=True)
+        self.assertEqual(self.counts(), (1, 0, 2))
+        self.assertEqual(self.counts(other.group_id), (0, 0, 7))
+
+        new_group = uuid.uuid4()
+        Guest.objects.filter(first_name__in=['Bob', 'Cy']).update(group_id=new_group)
+        self.assertEqual(self.counts(), (1, 0, 0))
+        self.assertEqual(self.counts(new_group), (0, 0, 2))
+        self.assertEqual(self.counts(other.group_id), (0, 0, 7))
+
+    def test_dashboard_reads_only_the_counters(self):
+        Guest.objects.create(first_name='Di', last_name='Solo', email='di@example.com', attending=False)
+        with self.assertNumQueries(1):
+            totals, groups = dashboard()
+        self.assertEqual(totals, (0, 1, 3, 4, 2))
+        self.assertEqual([group.pending for group in groups], [3, 0])
+
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        response = self.client.get(reverse('admin:rsvp_guest_dashboard'))
+        self.assertContains(response, 'Ann Family, Bob Family, Cy Family')
+        self.assertContains(response, reverse('admin:rsvp_guest_household', args=[self.group_id]))
+
+    def test_recompute_command_repairs_drift(self):
+        RSVPCounter.objects.filter(group_id=self.group_id).update(pending=7)
+        RSVPCounter.objects.create(group_id=uuid.uuid4(), pending=2)
+        out = StringIO()
+        call_command('recompute_rsvp_counters', stdout=out)
+        self.assertIn('Fixed 2 group counters', out.getvalue())
+        self.assertEqual(self.counts(), (0, 0, 3))
+        self.assertEqual(RSVPCounter.objects.count(), 1)
+        self.assertEqual(recompute(), 0)
+
+
+class GuestAdminTests(TestCase):
+    def setUp(self):
+        self.group_id = uuid.uuid4()
+        Guest.objects.bulk_create([
+            Guest(group_id=self.group_id, first_name='José', last_name='Ruiz', email='jose@example.com'),
+            Guest(group_id=self.group_id, first_name='Ana', last_name='Ruiz', email='ana@example.com', attending=True),
+            Guest(first_name='Bea', last_name='Adams', email='joss@example.com', attending=False),
+        ])
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        self.changelist = reverse('admin:rsvp_guest_changelist')
+
+    def listed(self, **params):
+        response = self.client.get(self.changelist, params)
+        self.assertEqual(response.status_code, 200)
+        return [str(guest) for guest in response.context['cl'].result_list]
+
+    def test_changelist_search_filter_and_ordering(self):
+        self.assertEqual(self.listed(), ['Bea Adams', 'Ana Ruiz', 'José Ruiz'])
+        self.assertEqual(self.listed(q='JOSE'), ['José Ruiz'])
+        self.assertEqual(self.listed(q='jos'), ['Bea Adams', 'José Ruiz'])
+        self.assertEqual(self.listed(q='ruiz a'), ['Ana Ruiz'])
+        self.assertEqual(self.listed(attending__exact='1'), ['Ana Ruiz'])
+        self.assertEqual(self.listed(attending__isnull='True'), ['José Ruiz'])
+
+    def test_set_attending_action_bulk_updates_changed_guests(self):
+        versions = dict(Guest.objects.values_list('first_name', 'version'))
+        response = self.client.post(self.changelist, {
+            'action': 'mark_attending',
+            '_selected_action': list(Guest.objects.values_list('pk', flat=True)),
+        }, follow=True)
+        self.assertContains(response, 'Marked 2 guests as attending.')
+        self.assertEqual(Guest.objects.filter(attending=True).count(), 3)
+        self.assertEqual(Guest.objects.get(first_name='Ana').version, versions['Ana'])
+        self.assertEqual(Guest.objects.get(first_name='Bea').version, versions['Bea'] + 1)
+        self.assertEqual(RSVPCounter.objects.get(group_id=self.group_id).attending, 2)
+
+    def test_household_page_edits_and_adds_members(self):
+        url = reverse('admin:rsvp_guest_household', args=[self.group_id])
+        response = self.client.get(url)
+        formset = response.context['formset']
+        self.assertEqual(len(formset.forms), 3)  # two guests and a blank row
+
+        data = {
+            'form-TOTAL_FORMS': '3', 'form-INITIAL_FORMS': '2',
+            'form-MIN_NUM_FORMS': '0', 'form-MAX_NUM_FORMS': '1000',
+        }
+        for i, form in enumerate(formset.forms):
+            data[f'form-{i}-id'] = form.instance.pk or ''
+            for name in ('first_name', 'last_name', 'email', 'dietary_restrictions'):
+                data[f'form-{i}-{name}'] = form.initial.get(name) or ''
+            data[f'form-{i}-attending'] = 'unknown'
+        data['form-0-attending'] = 'true'
+        data.update({'form-2-first_name': 'Luz', 'form-2-last_name': 'Ruiz', 'form-2-email': 'luz@example.com'})
+
+        response = self.client.post(url, data)
+        self.assertRedirects(response, url)
+        household = Guest.objects.filter(group_id=self.group_id)
+        self.assertEqual(sorted(household.values_list('first_name', 'attending')),
+                         [('Ana', None), ('José', True), ('Luz', None)])
+        self.assertEqual(self.client.get(reverse('admin:rsvp_guest_household', args=[uuid.uuid4()])).status_code, 404)
+
+    def household_data(self, rows):
+        url = reverse('admin:rsvp_guest_household', args=[self.group_id])
+        guests = list(Guest.objects.filter(group_id=self.group_id).order_by('id'))
+        data = {
+            'form-TOTAL_FORMS': str(len(rows)), 'form-INITIAL_FORMS': str(len(guests)),
+            'form-MIN_NUM_FORMS': '0', 'form-MAX_NUM_FORMS': '1000',
+        }
+        for i, (first_name, last_name) in enumerate(rows):
+            data.update({
+                f'form-{i}-id': guests[i].pk if i < len(guests) else '',
+                f'form-{i}-first_name': first_name, f'form-{i}-last_name': last_name,
+                f'form-{i}-email': f'guest{i}@example.com', f'form-{i}-attending': 'unknown',
+            })
+        return url, data
+
+    def test_household_page_rejects_duplicate_names(self):
+        url, data = self.household_data([('José', 'Ruiz'), ('Ana', 'Ruiz'), ('ANA', ' ruiz')])
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('already in this household', str(response.context['formset'].non_form_errors()))
+        self.assertEqual(Guest.objects.filter(group_id=self.group_id).count(), 2)
+
+        # A swap passes the form check but trips the constraint row by row
+        url, data = self.household_data([('Ana', 'Ruiz'), ('José', 'Ruiz')])
+        self.assertContains(self.client.post(url, data), 'nothing was saved')
+        self.assertEqual(Guest.objects.get(email='jose@example.com').first_name, 'José')
+
+    def test_household_page_needs_add_permission_for_new_members(self):
+        editor = User.objects.create_user('editor', password='pw', is_staff=True)
+        editor.user_permissions.add(Permission.objects.get(codename='change_guest'))
+        self.client.force_login(editor)
+        url, data = self.household_data([('José', 'Ruiz'), ('Ana', 'Ruiz'), ('Luz', 'Ruiz')])
+        self.assertEqual(len(self.client.get(url).context['formset'].forms), 2)
+        self.assertRedirects(self.client.post(url, data), url)
+        self.assertEqual(Guest.objects.filter(group_id=self.group_id).count(), 2)
+
+    def test_emails_are_stored_lowercased(self):
+        guest = Guest.objects.create(first_name='Cy', last_name='Ruiz', email=' Cy.Ruiz@Example.COM ')
+        self.assertEqual(guest.email, 'cy.ruiz@example.com')
+        Guest.objects.bulk_create([Guest(first_name='Di', last_name='Ruiz', email='Di@Example.com')])
+        Guest.objects.filter(first_name='Bea').update(email='BEA@example.com')
+        self.assertEqual(self.listed(q='Di@EX'), ['Di Ruiz'])
+        self.assertEqual(self.listed(q='bea@'), ['Bea Adams'])
+
+
+class BouncingEmailBackend(locmem.EmailBackend):
+    """locmem backend that refuses any address at bounce.example.com."""
+
+    def send_messages(self, messages):
+        for message in messages:
+            if any(address.endswith('@bounce.example.com') for address in message.to):
+                raise smtplib.SMTPRecipientsRefused({message.to[0]: (550, b'No such user')})
+        return super().send_messages(messages)
+
+
+class RSVPEmailTests(TestCase):
+    def setUp(self):
+        self.group_id = uuid.uuid4()
+        Guest.objects.bulk_create([
+            Guest(group_id=self.group_id, first_name='Ann', last_name='Smith', email='family@example.com', attending=True),
+            Guest(group_id=self.group_id, first_name='Bob', last_name='Smith', email='Family@example.com', attending=True),
+            Guest(group_id=self.group_id, first_name='Kid', last_name='Smith', email='kid@placeholder.com', attending=False),
+        ])
+        self.ann, self.bob, self.kid = Guest.objects.filter(group_id=self.group_id).order_by('id')
+
+    def post_group_answers(self):
+        data = {}
+        for guest in (self.ann, self.bob):
+            data[f'{guest.id}-email'] = guest.email
+            data[f'{guest.id}-dietary_restrictions'] = 'vegan' if guest is self.bob else ''
+            data[f'{guest.id}-message_for_couple'] = ''
+        response = self.client.post(reverse('group_rsvp_questions', args=[self.group_id]), data)
+        self.assertRedirects(response, reverse('group_thank_you', args=[self.group_id]), fetch_redirect_response=False)
+
+    def test_group_answers_queue_one_email_per_address_and_send_later(self):
+        self.post_group_answers()
+        self.assertEqual(mail.outbox, [])
+        queued = OutboxEmail.objects.get()
+        self.assertEqual((queued.to, queued.kind, queued.status), ('family@example.com', 'confirmation', 'pending'))
+
+        out = StringIO()
+        call_command('send_rsvp_emails', stdout=out)
+        self.assertIn('1 sent, 0 to retry, 0 failed', out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['family@example.com'])
+        self.assertIn('Hi Ann and Bob,', mail.outbox[0].body)
+        self.assertIn('Bob Smith: attending (dietary restrictions: vegan)', mail.outbox[0].body)
+        self.assertEqual(OutboxEmail.objects.get().status, 'sent')
+
+        # Answering again sends a change notice; an unsent one is replaced, not doubled
+        self.post_group_answers()
+        self.post_group_answers()
+        self.assertEqual(list(OutboxEmail.objects.filter(status='pending').values_list('kind', flat=True)), ['change'])
+        self.assertEqual(send_due_emails(), {'sent': 1})
+        self.assertIn('updated', mail.outbox[1].subject)
+
+    def test_answer_during_a_send_keeps_the_claimed_email(self):
+        self.post_group_answers()
+        self.assertEqual(len(_claim(10)), 1)  # a worker is sending the confirmation
+        self.post_group_answers()
+        self.assertEqual(
+            sorted(OutboxEmail.objects.values_list('kind', 'status')),
+            [('change', 'pending'), ('confirmation', 'sending')],
+        )
+        # Not claimable again until the worker's claim times out
+        self.assertEqual(send_due_emails(), {'sent': 1})
+        self.assertIn('updated', mail.outbox[0].subject)
+        OutboxEmail.objects.filter(status='sending').update(send_after=timezone.now())
+        self.assertEqual(send_due_emails(), {'sent': 1})
+
+    @override_settings(EMAIL_BACKEND='rsvp.tests.BouncingEmailBackend')
+    def test_failed_email_replaced_by_a_newer_answer_is_dropped(self):
+        Guest.objects.filter(group_id=self.group_id).update(email='family@bounce.example.com')
+        self.ann.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.post_group_answers()
+        _claim(10)
+        self.post_group_answers()  # queued while the first one is being sent
+        # The first worker died; both are sent together and both bounce
+        OutboxEmail.objects.filter(status='sending').update(send_after=timezone.now())
+        self.assertEqual(send_due_emails(), {'superseded': 1, 'retried': 1})
+        self.assertEqual(list(OutboxEmail.objects.values_list('kind', 'status')), [('change', 'pending')])
+
+    def test_single_guest_answer_is_queued(self):
+        response = self.client.post(reverse('rsvp_questions_yes', args=[self.ann.id]), {
+            'email': 'ann@example.com', 'dietary_restrictions': '', 'message_for_couple': '',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(OutboxEmail.objects.values_list('to', flat=True)), ['ann@example.com'])
+
+    @override_settings(EMAIL_BACKEND='rsvp.tests.BouncingEmailBackend', RSVP_EMAIL_MAX_ATTEMPTS=2)
+    def test_failures_are_retried_with_backoff_then_given_up(self):
+        Guest.objects.filter(pk=self.ann.pk).update(email='ann@bounce.example.com')
+        self.ann.refresh_from_db()
+        self.post_group_answers()
+        self.assertEqual(send_due_emails(), {'sent': 1, 'retried': 1})
+        bounced = OutboxEmail.objects.get(to='ann@bounce.example.com')
+        self.assertEqual(bounced.attempts, 1)
+        self.assertIn('SMTPRecipientsRefused', bounced.last_error)
+        self.assertGreater(bounced.send_after, timezone.now())
+
+        # Not due yet
+        self.assertEqual(send_due_emails(), {})
+        OutboxEmail.objects.filter(pk=bounced.pk).update(send_after=timezone.now())
+        self.assertEqual(send_due_emails(), {'failed': 1})
+        self.assertEqual(OutboxEmail.objects.get(pk=bounced.pk).status, 'failed')
+        self.assertEqual(len(mail.outbox), 1)
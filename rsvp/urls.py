@@ -12,4 +12,6 @@ urlpatterns = [
     path('group-questions/<uuid:group_id>/', views.group_rsvp_questions, name='group_rsvp_questions'),
     path('group-declined/<uuid:group_id>/', views.group_declined, name='group_declined'),
     path('group-thank-you/<uuid:group_id>/', views.group_thank_you, name='group_thank_you'),
+    path('export/guests.<str:fmt>', views.export_guests, name='export_guests'),
+    path('export/caterer.<str:fmt>', views.caterer_report_view, name='caterer_report'),
 ]
\ No newline at end of file
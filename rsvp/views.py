@@ -1,25 +1,45 @@
+from .exports import caterer_report, caterer_report_csv, caterer_report_json, export_response
 from .forms import GuestLookupForm
 from .forms import RSVPDetailsForm
-from .models import Guest
+from .groups import load_group
+from .models import Guest, GuestVersionConflict, RSVPSubmission
+from .notifications import queue_rsvp_emails
+from .search import search_guests
 from django.shortcuts import render
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.contrib.admin.views.decorators import staff_member_required
 from django.urls import reverse
 from django.shortcuts import render, get_object_or_404
 from django.contrib import messages
+from django.db import IntegrityError, transaction
+import uuid
+
+CONFLICT_MESSAGE = (
+    "Someone else in your party just updated this RSVP. "
+    "Please check the answers below and submit again."
+)
 
 def rsvp_entry_point(request):
     if request.method == 'POST':
         form = GuestLookupForm(request.POST)
         if form.is_valid():
-            first = form.cleaned_data['first_name'].strip()
-            last = form.cleaned_data['last_name'].strip()
-            matches = Guest.objects.filter(first_name__iexact=first, last_name__iexact=last)
+            first = form.cleaned_data['first_name']
+            last = form.cleaned_data['last_name']
+            # Single indexed query; evaluate once and branch on the list
+            matches = list(Guest.objects.lookup(first, last))
 
-            if not matches.exists():
+            if not matches:
+                # Typos and nicknames: offer close matches from the in-memory index
+                suggestions = search_guests(first, last)
+                if suggestions:
+                    return render(request, 'rsvp/select_guest.html', {
+                        'matches': suggestions,
+                        'suggested': True,
+                    })
                 return render(request, 'rsvp/not_found.html', {'form': form})
 
-            if matches.count() == 1:
-                guest = matches.first()
+            if len(matches) == 1:
+                guest = matches[0]
                 return render(request, 'rsvp/confirm_guest.html', {'guest': guest})
 
             return render(request, 'rsvp/select_guest.html', {'matches': matches})
@@ -44,19 +64,73 @@ def confirm_guest(request, guest_id):
 
     return render(request, 'rsvp/confirm_guest.html', {'guest': guest})
 
+def _idempotency_key(request):
+    try:
+        return uuid.UUID(request.POST.get('idempotency_key', ''))
+    except ValueError:
+        return None
+
+def _idempotent(request, handler):
+    """Run ``handler`` at most once per idempotency key.
+
+    A successful submission stores its redirect; a replayed POST with the
+    same key is answered from that receipt without touching any guests.
+    Concurrent duplicates race on the unique key and the loser's writes
+    are rolled back.
+    """
+    key = _idempotency_key(request)
+    if key is None:
+        return handler()
+
+    receipt = RSVPSubmission.objects.filter(key=key).first()
+    if receipt is None:
+        try:
+            with transaction.atomic():
+                response = handler()
+                if isinstance(response, HttpResponseRedirect):
+                    RSVPSubmission.objects.create(key=key, redirect_url=response.url)
+                    return response
+        except IntegrityError:
+            receipt = RSVPSubmission.objects.filter(key=key).first()
+            if receipt is None:
+                raise
+        else:
+            # A twin request may have won while this one hit a conflict
+            receipt = RSVPSubmission.objects.filter(key=key).first()
+            if receipt is None:
+                return response
+    return HttpResponseRedirect(receipt.redirect_url)
+
+def _apply_posted_versions(request, guests, name='version_{id}'):
+    """Use the versions the form was rendered with, so edits made since then are detected."""
+    for guest in guests:
+        try:
+            guest.version = int(request.POST[name.format(id=guest.id)])
+        except (KeyError, ValueError):
+            pass
+
 def rsvp_confirm_attendance(request, guest_id):
     guest = get_object_or_404(Guest, pk=guest_id)
     if request.method == 'POST':
-        attending = request.POST.get('attending')
-        if attending == 'yes':
-            guest.attending = True
-            guest.save()
-            return HttpResponseRedirect(reverse('rsvp_questions_yes', args=[guest.id]))
-        elif attending == 'no':
-            guest.attending = False
-            guest.save()
+        return _idempotent(request, lambda: _confirm_attendance(request, guest))
+    return render(request, 'rsvp/rsvp_confirm.html', {'guest': guest, 'idempotency_key': uuid.uuid4()})
+
+def _confirm_attendance(request, guest):
+    attending = request.POST.get('attending')
+    if attending in ('yes', 'no'):
+        _apply_posted_versions(request, [guest], name='version')
+        dirty = {}
+        _set_changed(guest, dirty, attending=attending == 'yes')
+        try:
+            _save_changed(dirty)
+        except GuestVersionConflict:
+            guest.refresh_from_db()
+            messages.warning(request, CONFLICT_MESSAGE)
+        else:
+            if guest.attending:
+                return HttpResponseRedirect(reverse('rsvp_questions_yes', args=[guest.id]))
             return HttpResponseRedirect(reverse('rsvp_questions_no', args=[guest.id]))
-    return render(request, 'rsvp/rsvp_confirm.html', {'guest': guest})
+    return render(request, 'rsvp/rsvp_confirm.html', {'guest': guest, 'idempotency_key': uuid.uuid4()})
 
 def rsvp_questions_yes(request, guest_id):
     guest = get_object_or_404(Guest, pk=guest_id)
@@ -64,6 +138,7 @@ def rsvp_questions_yes(request, guest_id):
         form = RSVPDetailsForm(request.POST, instance=guest)
         if form.is_valid():
             form.save()
+            queue_rsvp_emails([guest])
             # For single guests, pass as single guest
             return render(request, 'rsvp/thank_you.html', {'guest': guest})
     else:
@@ -76,53 +151,94 @@ def rsvp_questions_no(request, guest_id):
         form = RSVPDetailsForm(request.POST, instance=guest)
         if form.is_valid():
             form.save()
+            queue_rsvp_emails([guest])
             return render(request, 'rsvp/thank_you.html', {'guest': guest})
     else:
         form = RSVPDetailsForm(instance=guest)
     return render(request, 'rsvp/rsvp_questions_no.html', {'form': form, 'guest': guest})
 
+def _set_changed(guest, dirty, **values):
+    """Assign ``values`` to ``guest``, recording only fields that actually change."""
+    for field, value in values.items():
+        if getattr(guest, field) != value:
+            setattr(guest, field, value)
+            dirty.setdefault(guest, set()).add(field)
+
+def _save_changed(dirty):
+    """Write every dirty guest with a single versioned UPDATE (no-op if nothing changed).
+
+    Raises GuestVersionConflict, writing nothing, if any of them changed underneath us.
+    """
+    if dirty:
+        fields = sorted(set().union(*dirty.values()))
+        Guest.objects.bulk_update_versioned(dirty, fields)
+
+def _apply_declined_contact_info(request, guests, dirty):
+    """Pick up the optional email/message fields posted for declined guests."""
+    for guest in guests:
+        email = request.POST.get(f"email_{guest.id}")
+        message = request.POST.get(f"message_{guest.id}")
+        if email:
+            _set_changed(guest, dirty, email=email)
+        if message:
+            _set_changed(guest, dirty, message_for_couple=message)
+
 def confirm_group_attendance(request, group_id):
-    guests = Guest.objects.filter(group_id=group_id)
-    if not guests.exists():
+    group = load_group(group_id)
+    if group is None:
         return HttpResponseRedirect(reverse('rsvp'))
 
     if request.method == 'POST':
-        # Process all guests in the group
-        attending_guests = []
-        not_attending_guests = []
-        
-        for guest in guests:
-            attending = request.POST.get(f"attending_{guest.id}")
-            if attending == 'yes':
-                guest.attending = True
-                attending_guests.append(guest)
-            elif attending == 'no':
-                guest.attending = False
-                not_attending_guests.append(guest)
-            guest.save()
-        
-        # No need to store in session since we pass group_id in URL
-        
-        # Redirect based on who's attending
-        if attending_guests and not_attending_guests:
-            # Mixed group - some attending, some not
-            return HttpResponseRedirect(reverse('group_rsvp_questions', args=[group_id]))
-        elif attending_guests:
-            # Everyone attending
-            return HttpResponseRedirect(reverse('group_rsvp_questions', args=[group_id]))
-        else:
-            # All guests declined
-            return HttpResponseRedirect(reverse('group_declined', args=[group_id]))
+        return _idempotent(request, lambda: _confirm_group_attendance(request, group))
 
-    return render(request, 'rsvp/group_confirm.html', {'guests': guests})
+    return render(request, 'rsvp/group_confirm.html', {
+        'guests': group.guests,
+        'idempotency_key': uuid.uuid4(),
+    })
+
+def _confirm_group_attendance(request, group):
+    group_id = group.group_id
+    # Process all guests in the group
+    attending_guests = []
+    not_attending_guests = []
+    dirty = {}
+
+    _apply_posted_versions(request, group.guests)
+    for guest in group.guests:
+        attending = request.POST.get(f"attending_{guest.id}")
+        if attending == 'yes':
+            _set_changed(guest, dirty, attending=True)
+            attending_guests.append(guest)
+        elif attending == 'no':
+            _set_changed(guest, dirty, attending=False)
+            not_attending_guests.append(guest)
+    try:
+        _save_changed(dirty)
+    except GuestVersionConflict:
+        messages.warning(request, CONFLICT_MESSAGE)
+        return render(request, 'rsvp/group_confirm.html', {
+            'guests': load_group(group_id).guests,
+            'idempotency_key': uuid.uuid4(),
+        })
+    
+    # No need to store in session since we pass group_id in URL
+    
+    # Redirect based on who's attending
+    if attending_guests and not_attending_guests:
+        # Mixed group - some attending, some not
+        return HttpResponseRedirect(reverse('group_rsvp_questions', args=[group_id]))
+    elif attending_guests:
+        # Everyone attending
+        return HttpResponseRedirect(reverse('group_rsvp_questions', args=[group_id]))
+    else:
+        # All guests declined
+        return HttpResponseRedirect(reverse('group_declined', args=[group_id]))
 
 def group_rsvp_questions(request, group_id):
     """Handle RSVP questions for all attending guests in a group"""
-    guests = Guest.objects.filter(group_id=group_id)
-    attending_guests = guests.filter(attending=True)
-    not_attending_guests = guests.filter(attending=False)
+    group = load_group(group_id)
     
-    if not attending_guests.exists():
+    if group is None or not group.attending:
         return HttpResponseRedirect(reverse('group_declined', args=[group_id]))
     
     if request.method == 'POST':
@@ -130,62 +246,97 @@ def group_rsvp_questions(request, group_id):
         forms = {}
         
         # Create and validate forms for all attending guests
-        for guest in attending_guests:
+        _apply_posted_versions(request, group.guests)
+        for guest in group.attending:
             form = RSVPDetailsForm(request.POST, instance=guest, prefix=str(guest.id))
             forms[guest.id] = form
             if not form.is_valid():
                 all_forms_valid = False
         
         # Handle declined guests' contact info
-        for guest in not_attending_guests:
-            email = request.POST.get(f"email_{guest.id}")
-            message = request.POST.get(f"message_{guest.id}")
-            if email:
-                guest.email = email
-            if message:
-                guest.message = message
-            guest.save()
-        
+        dirty = {}
+        _apply_declined_contact_info(request, group.declined, dirty)
+
         if all_forms_valid:
-            # Save all attending guest forms
-            for guest_id, form in forms.items():
-                form.save()
+            # Valid forms have already copied their data onto the instance
+            for form in forms.values():
+                if form.has_changed():
+                    dirty.setdefault(form.instance, set()).update(form.changed_data)
+        try:
+            _save_changed(dirty)
+        except GuestVersionConflict:
+            # Show the fresh data, keeping what this guest typed for another try
+            messages.warning(request, CONFLICT_MESSAGE)
+            all_forms_valid = False
+            group = load_group(group_id)
+            if group is None or not group.attending:
+                return HttpResponseRedirect(reverse('group_declined', args=[group_id]))
+            forms = {
+                guest.id: RSVPDetailsForm(request.POST, instance=guest, prefix=str(guest.id))
+                for guest in group.attending
+            }
+
+        if all_forms_valid:
+            queue_rsvp_emails(group.guests)
             return HttpResponseRedirect(reverse('group_thank_you', args=[group_id]))
     else:
         # Create forms for GET request
         forms = {}
-        for guest in attending_guests:
+        for guest in group.attending:
             forms[guest.id] = RSVPDetailsForm(instance=guest, prefix=str(guest.id))
     
     # Pair attending guests with their forms for template
-    attending_guest_forms = [(guest, forms[guest.id]) for guest in attending_guests]
+    attending_guest_forms = [(guest, forms[guest.id]) for guest in group.attending if guest.id in forms]
     
     return render(request, 'rsvp/group_rsvp_questions.html', {
         'attending_guest_forms': attending_guest_forms,
-        'not_attending_guests': not_attending_guests,
+        'not_attending_guests': group.declined,
         'group_id': group_id
     })
 
 def group_declined(request, group_id):
     """Page for when all group members decline"""
-    guests = Guest.objects.filter(group_id=group_id, attending=False)
+    group = load_group(group_id)
+    guests = group.declined if group else ()
     
     if request.method == 'POST':
         # Process any optional contact info they want to provide
-        for guest in guests:
-            email = request.POST.get(f"email_{guest.id}")
-            message = request.POST.get(f"message_{guest.id}")
-            if email:
-                guest.email = email
-            if message:
-                guest.message = message
-            guest.save()
-        
-        return HttpResponseRedirect(reverse('group_thank_you', args=[group_id]))
+        dirty = {}
+        _apply_posted_versions(request, guests)
+        _apply_declined_contact_info(request, guests, dirty)
+        try:
+            _save_changed(dirty)
+        except GuestVersionConflict:
+            messages.warning(request, CONFLICT_MESSAGE)
+            group = load_group(group_id)
+            guests = group.declined if group else ()
+        else:
+            queue_rsvp_emails(guests)
+            return HttpResponseRedirect(reverse('group_thank_you', args=[group_id]))
     
     return render(request, 'rsvp/group_declined.html', {'guests': guests, 'group_id': group_id})
 
 def group_thank_you(request, group_id):
     """Thank you page for group RSVPs"""
-    guests = Guest.objects.filter(group_id=group_id)
-    return render(request, 'rsvp/group_thank_you.html', {'guests': guests, 'group_id': group_id})
\ No newline at end of file
+    group = load_group(group_id)
+    guests = group.guests if group else ()
+    return render(request, 'rsvp/group_thank_you.html', {'guests': guests, 'group_id': group_id})
+
+@staff_member_required
+def export_guests(request, fmt):
+    """The whole guest list as a streamed CSV or JSON download."""
+    if fmt not in ('csv', 'json'):
+        raise Http404("Unknown export format")
+    return export_response(Guest.objects.all(), fmt)
+
+@staff_member_required
+def caterer_report_view(request, fmt):
+    """Headcounts and dietary restrictions for the caterer, as CSV or JSON."""
+    report = caterer_report(Guest.objects.all())
+    if fmt == 'csv':
+        response = HttpResponse(''.join(caterer_report_csv(report)), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="caterer-report.csv"'
+        return response
+    if fmt == 'json':
+        return HttpResponse(caterer_report_json(report), content_type='application/json')
+    raise Http404("Unknown report format")
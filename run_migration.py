@@ -1,31 +1,34 @@
 #!/usr/bin/env python
 """
-Migration script for Railway environment.
-Runs Django migrations on startup.
+Startup script for the Railway environment.
+
+Makes sure the database is migrated and has the story entries before
+gunicorn starts, skipping the work when a single query shows there is
+nothing to do, and prints how long each phase took. Pass --full to
+always run migrate as before.
 """
 
+import argparse
 import os
+import time
+
 import django
-from django.core.management import execute_from_command_line
 
 
-def run_migration():
+def run_migration(full=False):
+    started = time.perf_counter()
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wedding_site.settings')
     django.setup()
 
-    print("Running migrations...")
-    execute_from_command_line(['manage.py', 'migrate', '--run-syncdb'])
-    print("Migrations complete.")
+    from wedding.boot import BootTimer, boot
 
-    # Load story entries fixture if the table is empty
-    from wedding.models import StoryEntry
-    if StoryEntry.objects.count() == 0:
-        print("No story entries found — loading fixture...")
-        execute_from_command_line(['manage.py', 'loaddata', 'wedding/fixtures/story_entries_backup.json'])
-        print(f"Loaded {StoryEntry.objects.count()} story entries.")
-    else:
-        print(f"Story entries already exist ({StoryEntry.objects.count()}), skipping fixture load.")
+    timer = BootTimer(started)
+    timer.phase('setup', started)
+    boot(full=full, timer=timer)
+    print(f"Startup: {timer.report()}")
 
 
 if __name__ == '__main__':
-    run_migration()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--full', action='store_true', help='Always run migrate, skipping the readiness check.')
+    run_migration(full=parser.parse_args().full)
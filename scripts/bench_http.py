@@ -0,0 +1,163 @@
+"""
+Closed-loop HTTP load generator for comparing server setups.
+
+Each of ``--concurrency`` client threads keeps one keep-alive connection
+open and requests the given paths in turn as fast as the server answers,
+for ``--duration`` seconds after a short warm-up. Prints requests per
+second, latency percentiles and error count.
+
+    python scripts/bench_http.py http://127.0.0.1:8000 /wedding/our-story/ /rsvp/ -c 16 -d 20 \
+        -H 'X-Forwarded-Proto: https'
+
+(With DEBUG off the site redirects plain HTTP, so send the header the
+proxy would.)
+
+``--slow-clients N`` adds N connections that behave like phones on a bad
+network. Each sends its request a few bytes at a time (``--slow-chunk``
+bytes every ``--slow-interval`` seconds), then reads the response, and
+repeats. The report counts how many of those requests completed.
+
+Run it from another machine (or pinned to other CPUs) when you can: on
+the same cores the client competes with the server it is measuring.
+"""
+
+import argparse
+import http.client
+import socket
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+BenchResult = namedtuple('BenchResult', 'rps latencies errors slow_requests')
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def _get(connection, path, headers):
+    connection.request('GET', path, headers=headers)
+    response = connection.getresponse()
+    response.read()
+    if response.getheader('Connection', '').lower() == 'close':
+        connection.close()
+    return response.status
+
+
+def _client(host, port, paths, headers, stop, warmup_until, latencies, errors, lock):
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    headers = {'Host': host, **headers}
+    mine = []
+    failed = 0
+    i = 0
+    while not stop.is_set():
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            try:
+                status = _get(connection, path, headers)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection (a worker
+                # being recycled); browsers and proxies retry once, so do we
+                connection.close()
+                status = _get(connection, path, headers)
+            ok = status < 400
+        except (OSError, http.client.HTTPException):
+            ok = False
+            connection.close()
+        if started < warmup_until:
+            continue
+        if ok:
+            mine.append(time.perf_counter() - started)
+        else:
+            failed += 1
+    connection.close()
+    with lock:
+        latencies.extend(mine)
+        errors[0] += failed
+
+
+def _slow_client(host, port, path, headers, stop, chunk, interval, completed, lock):
+    lines = [f'GET {path} HTTP/1.1', f'Host: {host}'] + [f'{name}: {value}' for name, value in headers.items()]
+    request = ('\r\n'.join(lines) + '\r\n\r\n').encode()
+    while not stop.is_set():
+        try:
+            with socket.create_connection((host, port), timeout=30) as sock:
+                for start in range(0, len(request), chunk):
+                    if stop.is_set():
+                        return
+                    sock.sendall(request[start:start + chunk])
+                    time.sleep(interval)
+                response = http.client.HTTPResponse(sock)
+                response.begin()
+                response.read()
+        except (OSError, http.client.HTTPException):
+            time.sleep(interval)
+            continue
+        with lock:
+            completed[0] += 1
+
+
+def run(base_url, paths, concurrency=8, duration=10.0, warmup=2.0, headers=None,
+        slow_clients=0, slow_chunk=8, slow_interval=0.25):
+    """BenchResult for one run; latencies are sorted, in seconds, and from the fast clients only."""
+    url = urlsplit(base_url)
+    host, port, headers = url.hostname, url.port or 80, headers or {}
+    stop = threading.Event()
+    latencies, errors, slow_requests, lock = [], [0], [0], threading.Lock()
+    warmup_until = time.perf_counter() + warmup
+    threads = [
+        threading.Thread(target=_client, args=(host, port, paths, headers, stop, warmup_until, latencies, errors, lock))
+        for _ in range(concurrency)
+    ] + [
+        threading.Thread(
+            target=_slow_client,
+            args=(host, port, paths[i % len(paths)], headers, stop, slow_chunk, slow_interval, slow_requests, lock),
+        )
+        for i in range(slow_clients)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(warmup + duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return BenchResult(len(latencies) / duration, latencies, errors[0], slow_requests[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('base_url')
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('-c', '--concurrency', type=int, default=8)
+    parser.add_argument('-d', '--duration', type=float, default=10.0)
+    parser.add_argument('-w', '--warmup', type=float, default=2.0)
+    parser.add_argument('-H', '--header', action='append', default=[], help="'Name: value', may be repeated")
+    parser.add_argument('--slow-clients', type=int, default=0)
+    parser.add_argument('--slow-chunk', type=int, default=8, help="bytes per send")
+    parser.add_argument('--slow-interval', type=float, default=0.25, help="seconds between sends")
+    args = parser.parse_args()
+
+    headers = dict(header.split(':', 1) for header in args.header)
+    headers = {name.strip(): value.strip() for name, value in headers.items()}
+    result = run(
+        args.base_url, args.paths, args.concurrency, args.duration, args.warmup, headers,
+        args.slow_clients, args.slow_chunk, args.slow_interval,
+    )
+    latencies = result.latencies
+    print(
+        f"{result.rps:.0f} req/s  p50 {percentile(latencies, 0.5) * 1000:.1f}ms  "
+        f"p95 {percentile(latencies, 0.95) * 1000:.1f}ms  p99 {percentile(latencies, 0.99) * 1000:.1f}ms  "
+        f"errors {result.errors}"
+        + (f"  slow requests done {result.slow_requests}" if args.slow_clients else '')
+    )
+
+
+if __name__ == '__main__':
+    main()
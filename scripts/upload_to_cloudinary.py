@@ -1,17 +1,23 @@
 #!/usr/bin/env python
 """
-Batch compress and upload all static images to Cloudinary.
+Sync the static images to Cloudinary.
 Organizes uploads by folder matching the local directory structure.
 
+Only new files, and files whose bytes or compression settings changed
+since the last sync, are compressed and uploaded; the manifest records a
+hash of each. Compression runs in a process pool and uploads in a thread
+pool, and the manifest is saved after every upload, so rerunning after a
+failure resumes where it stopped.
+
 Usage:
-    python scripts/upload_to_cloudinary.py
+    python scripts/upload_to_cloudinary.py --dry-run
+    python scripts/upload_to_cloudinary.py [--only images/gallery] [--delete-orphans]
 """
 
+import argparse
 import os
 import sys
-import json
 from pathlib import Path
-from io import BytesIO
 
 # Add project root to path
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -21,158 +27,137 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wedding_site.settings')
 import django
 django.setup()
 
-from django.conf import settings
-from PIL import Image
-import cloudinary
-import cloudinary.uploader
-
-# Configure Cloudinary (reads credentials from .env via Django settings)
-cloudinary.config(
-    cloud_name=settings.CLOUDINARY_STORAGE['CLOUD_NAME'],
-    api_key=settings.CLOUDINARY_STORAGE['API_KEY'],
-    api_secret=settings.CLOUDINARY_STORAGE['API_SECRET'],
-)
+# The Cloudinary SDK configures itself from settings.CLOUDINARY on import
+from wedding import upload_pipeline
 
 STATIC_ROOT = PROJECT_ROOT / 'wedding' / 'static'
 
-# Upload mapping: (local_dir, cloudinary_folder, max_width, quality, resource_type)
+# Upload mapping: (local_dir, cloudinary_folder, max_width, quality, resource_type, target_kb)
+# With a target_kb, quality is the ceiling of a search for the best quality under that size.
 UPLOAD_CONFIGS = [
     # Gallery photos — heavy compression
-    ('images/gallery/denver-botanic-gardens', 'wedding-site/gallery/denver-botanic-gardens', 2000, 82, 'image'),
-    ('images/gallery/telluride', 'wedding-site/gallery/telluride', 2000, 82, 'image'),
+    ('images/gallery/denver-botanic-gardens', 'wedding-site/gallery/denver-botanic-gardens', 2000, 82, 'image', 450),
+    ('images/gallery/telluride', 'wedding-site/gallery/telluride', 2000, 82, 'image', 450),
     # Background images
-    ('images/backgrounds', 'wedding-site/backgrounds', 2000, 85, 'image'),
+    ('images/backgrounds', 'wedding-site/backgrounds', 2000, 85, 'image', None),
     # Itinerary illustrations (smaller PNGs, keep quality high)
-    ('images/itinerary', 'wedding-site/itinerary', 1200, 90, 'image'),
+    ('images/itinerary', 'wedding-site/itinerary', 1200, 90, 'image', None),
     # Our Story images
-    ('images/ourStory', 'wedding-site/our-story', 1600, 85, 'image'),
+    ('images/ourStory', 'wedding-site/our-story', 1600, 85, 'image', None),
     # Header (logo, favicon — keep crisp)
-    ('images/header', 'wedding-site/header', None, 95, 'image'),
+    ('images/header', 'wedding-site/header', None, 95, 'image', None),
     # Honeymoon fund
-    ('honeymoon_fund', 'wedding-site/honeymoon-fund', 1600, 85, 'image'),
+    ('honeymoon_fund', 'wedding-site/honeymoon-fund', 1600, 85, 'image', None),
 ]
 
-# Track all uploads for reference
-upload_manifest = {}
-
-
-def compress_image(filepath, max_width=None, quality=85):
-    """Compress an image and return bytes. Returns (bytes, format)."""
-    img = Image.open(filepath)
-
-    # Convert RGBA to RGB for JPEG output (keep PNG for transparency)
-    has_transparency = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
-
-    if max_width and img.width > max_width:
-        ratio = max_width / img.width
-        new_height = int(img.height * ratio)
-        img = img.resize((max_width, new_height), Image.LANCZOS)
-
-    buffer = BytesIO()
-
-    if has_transparency:
-        # Keep as PNG for images with transparency
-        img.save(buffer, format='PNG', optimize=True)
-        fmt = 'png'
-    else:
-        # Convert to RGB and save as JPEG
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        img.save(buffer, format='JPEG', quality=quality, optimize=True)
-        fmt = 'jpg'
-
-    buffer.seek(0)
-    original_size = os.path.getsize(filepath)
-    compressed_size = buffer.getbuffer().nbytes
+MANIFEST_PATH = PROJECT_ROOT / 'scripts' / 'cloudinary_manifest.json'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dry-run', action='store_true', help='Print the plan without compressing or uploading')
+    parser.add_argument('--only', action='append', metavar='DIR',
+                        help='Only sync local dirs starting with DIR, e.g. images/gallery (repeatable)')
+    parser.add_argument('--delete-orphans', action='store_true',
+                        help='Delete remote images whose local file is gone, and drop them from the manifest')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-upload files even if they are unchanged')
+    parser.add_argument('--format', choices=sorted(upload_pipeline.OUTPUT_FORMATS), default='jpeg',
+                        help='Format to upload opaque images as (default: jpeg; transparent ones stay PNG '
+                             'unless the format supports alpha)')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Compression worker processes (default: one per CPU)')
+    parser.add_argument('--threads', type=int, default=4, help='Concurrent uploads (default: 4)')
+    parser.add_argument('--retries', type=int, default=3, help='Retries per upload, with backoff (default: 3)')
+    return parser.parse_args()
+
+
+def print_plan(plan):
+    for label, jobs in (('new', plan.new), ('changed', plan.changed)):
+        for job in jobs:
+            print(f"  {label:8} {job.key}")
+    for key in plan.orphans:
+        print(f"  {'orphan':8} {key}")
+    print(f"\n  {len(plan.new)} new, {len(plan.changed)} changed, "
+          f"{len(plan.unchanged)} unchanged, {len(plan.orphans)} orphaned")
 
-    return buffer, fmt, original_size, compressed_size
 
+def main():
+    args = parse_args()
+    try:
+        upload_pipeline.check_output_format(args.format)
+    except ValueError as exc:
+        sys.exit(str(exc))
+    print("=" * 60)
+    print("Cloudinary Sync" + (" (dry run)" if args.dry_run else ""))
+    print("=" * 60)
 
-def upload_file(buffer, folder, public_id, resource_type='image'):
-    """Upload a file buffer to Cloudinary."""
-    result = cloudinary.uploader.upload(
-        buffer,
-        folder=folder,
-        public_id=public_id,
-        overwrite=True,
-        resource_type=resource_type,
-    )
-    return result
-
-
-def process_directory(local_dir, cloud_folder, max_width, quality, resource_type):
-    """Compress and upload all images in a directory."""
-    full_path = STATIC_ROOT / local_dir
-
-    if not full_path.exists():
-        print(f"  SKIP: {local_dir} does not exist")
-        return
-
-    # Get image files (skip directories and hidden files)
-    extensions = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
-    files = sorted([
-        f for f in full_path.iterdir()
-        if f.is_file() and f.suffix.lower() in extensions and not f.name.startswith('.')
-    ])
-
-    if not files:
-        print(f"  SKIP: No image files in {local_dir}")
+    configs = [
+        config for config in UPLOAD_CONFIGS
+        if not args.only or config[0].startswith(tuple(args.only))
+    ]
+    checkpoint = upload_pipeline.ManifestCheckpoint(MANIFEST_PATH)
+    jobs = []
+    synced_dirs = []
+    for local_dir, cloud_folder, max_width, quality, resource_type, target_kb in configs:
+        if not (STATIC_ROOT / local_dir).is_dir():
+            # Never treat a missing checkout directory as "every file was deleted"
+            print(f"  SKIP: {local_dir} does not exist")
+            continue
+        synced_dirs.append(local_dir)
+        jobs += upload_pipeline.find_jobs(
+            STATIC_ROOT, local_dir, cloud_folder, max_width, quality, target_kb, args.format,
+        )
+
+    plan = upload_pipeline.plan_sync(jobs, checkpoint, synced_dirs, force=args.force)
+    print_plan(plan)
+    if args.dry_run:
         return
 
     total_original = 0
     total_compressed = 0
+    uploaded = 0
+    failed = 0
+    results = upload_pipeline.run(
+        plan.new + plan.changed, upload_pipeline.CloudinaryUploader(), checkpoint,
+        processes=args.processes, threads=args.threads, retries=args.retries,
+    )
+    for result in results:
+        name = result.job.key
+        if result.error is not None:
+            failed += 1
+            print(f"  ERROR {name}: {result.error}")
+            continue
+        uploaded += 1
+        total_original += result.original_size
+        total_compressed += result.compressed_size
+        peak = f"{result.peak_rss / (1024 * 1024):.0f} MB" if result.peak_rss else "n/a"
+        print(f"  {name}: {result.original_size / (1024 * 1024):.1f} MB -> "
+              f"{result.compressed_size / 1024:.0f} KB (peak RSS {peak}) | {result.entry['url']}")
+
+    deleted = 0
+    if args.delete_orphans:
+        for key, error in upload_pipeline.delete_orphans(
+            plan.orphans, upload_pipeline.CloudinaryUploader(), checkpoint, retries=args.retries,
+        ):
+            if error is not None:
+                failed += 1
+                print(f"  ERROR deleting {key}: {error}")
+            else:
+                deleted += 1
+                print(f"  deleted {key}")
 
-    for filepath in files:
-        # Sanitize public_id: replace & with _and_, remove other invalid chars
-        public_id = filepath.stem.replace('&', '_and_')
-
-        try:
-            buffer, fmt, orig_size, comp_size = compress_image(filepath, max_width, quality)
-            total_original += orig_size
-            total_compressed += comp_size
-
-            result = upload_file(buffer, cloud_folder, public_id)
-
-            orig_mb = orig_size / (1024 * 1024)
-            comp_kb = comp_size / 1024
-            print(f"  {filepath.name}: {orig_mb:.1f} MB -> {comp_kb:.0f} KB | {result['secure_url']}")
-
-            upload_manifest[f"{local_dir}/{filepath.name}"] = {
-                'public_id': result['public_id'],
-                'url': result['secure_url'],
-                'format': result['format'],
-                'width': result['width'],
-                'height': result['height'],
-                'bytes': result['bytes'],
-            }
-
-        except Exception as e:
-            print(f"  ERROR {filepath.name}: {e}")
-
-    orig_total_mb = total_original / (1024 * 1024)
-    comp_total_mb = total_compressed / (1024 * 1024)
     reduction = (1 - total_compressed / total_original) * 100 if total_original > 0 else 0
-    print(f"  Subtotal: {orig_total_mb:.1f} MB -> {comp_total_mb:.1f} MB ({reduction:.0f}% reduction)")
-
-
-def main():
-    print("=" * 60)
-    print("Cloudinary Batch Upload")
-    print("=" * 60)
-
-    for local_dir, cloud_folder, max_width, quality, resource_type in UPLOAD_CONFIGS:
-        print(f"\n[{cloud_folder}]")
-        process_directory(local_dir, cloud_folder, max_width, quality, resource_type)
-
-    # Save manifest
-    manifest_path = PROJECT_ROOT / 'scripts' / 'cloudinary_manifest.json'
-    with open(manifest_path, 'w') as f:
-        json.dump(upload_manifest, f, indent=2)
-
     print(f"\n{'=' * 60}")
-    print(f"Upload complete! {len(upload_manifest)} files uploaded.")
-    print(f"Manifest saved to: {manifest_path}")
+    print(f"Sync complete! {uploaded} uploaded, {len(plan.unchanged)} unchanged, "
+          f"{deleted} deleted, {failed} failed.")
+    if uploaded:
+        print(f"Uploaded: {total_original / (1024 * 1024):.1f} MB -> {total_compressed / (1024 * 1024):.1f} MB "
+              f"({reduction:.0f}% reduction)")
+    print(f"Manifest saved to: {MANIFEST_PATH}")
     print("=" * 60)
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == '__main__':
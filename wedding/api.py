@@ -0,0 +1,49 @@
+"""
+Story entry JSON API.
+
+Kept apart from the page views so that Django REST framework, whose
+imports pull in yaml, requests and pygments, is only loaded when the API
+is first called (see ``wedding.urls``), not by every worker and
+management command that loads the URLconf.
+"""
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework import viewsets
+from rest_framework.response import Response
+
+from .models import StoryEntry
+from .pagination import StoryEntryCursorPagination
+from .serializers import StoryEntrySerializer
+from .story_cache import api_etag, api_etag_aggregates, get_api_payload
+
+
+class StoryEntryViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = StoryEntry.objects.all()
+    serializer_class = StoryEntrySerializer
+    pagination_class = StoryEntryCursorPagination
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(request, self.get_queryset(), lambda: super(StoryEntryViewSet, self).list(request).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        queryset = self.get_queryset().filter(pk=kwargs['pk'])
+        return self._cached_response(request, queryset, lambda: super(StoryEntryViewSet, self).retrieve(request, *args, **kwargs).data)
+
+    def _cached_response(self, request, queryset, build):
+        stats = queryset.aggregate(**api_etag_aggregates())
+        etag = api_etag(stats, request.accepted_renderer.format, request)
+        not_modified = get_conditional_response(request, etag=etag)
+        response = not_modified or Response(get_api_payload(etag, build))
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=settings.STORY_API_MAX_AGE)
+        return response
+
+
+def list_payload(request):
+    """The list endpoint's body for a plain Django ``request``, as StoryEntryViewSet.list builds it."""
+    view = StoryEntryViewSet(action_map={'get': 'list'}, format_kwarg=None, args=(), kwargs={})
+    view.request = view.initialize_request(request)
+    # Content negotiation and the permission checks, as dispatch() would run them
+    view.initial(view.request)
+    return viewsets.ReadOnlyModelViewSet.list(view, view.request).data
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class WeddingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'wedding'
+
+    def ready(self):
+        # Registers the receivers that invalidate the cached story timeline
+        # and count database connections
+        from . import db_stats, story_cache  # noqa: F401
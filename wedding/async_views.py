@@ -0,0 +1,90 @@
+"""
+Async versions of the read-only wedding views, for serving under ASGI.
+
+``wedding.urls`` routes to these instead of ``wedding.views`` when
+``ASYNC_VIEWS`` is on, which ``wedding_site/asgi.py`` turns on. The cache
+and ORM calls are awaited, so one event loop keeps many slow mobile
+connections open without a thread each. Templates still render inline.
+That is CPU work with no queries, because the story timeline arrives
+pre-rendered.
+
+The story list answers JSON itself, with the same ETags and cached
+payloads as StoryEntryViewSet. It hands anything else (the browsable
+API, ``?format=``, HEAD and OPTIONS) to the DRF view in a thread.
+"""
+
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+from .models import StoryEntry
+from .page_cache import cached_page
+from .story_cache import aget_api_payload, aget_timeline_html, api_etag, api_etag_aggregates
+from .views import gallery_context
+
+
+@cached_page
+async def home(request):
+    return render(request, 'wedding/home.html')
+
+
+async def our_story(request):
+    return render(request, 'wedding/our_story.html', {
+        'timeline_html': await aget_timeline_html(),
+    })
+
+
+@cached_page
+async def itinerary(request):
+    return render(request, 'wedding/itinerary.html')
+
+
+async def gallery(request):
+    return render(request, 'wedding/gallery.html', gallery_context())
+
+
+@cached_page
+async def honeymoon_fund(request):
+    return render(request, 'wedding/honeymoon_fund.html')
+
+
+@cached_page
+async def downtown_westminster(request):
+    return render(request, 'wedding/downtown_westminster.html')
+
+
+@cached_page
+async def faq(request):
+    return render(request, 'wedding/faq.html')
+
+
+def _drf_list(request):
+    from .api import StoryEntryViewSet
+    return StoryEntryViewSet.as_view({'get': 'list'})(request)
+
+
+def _list_payload(request):
+    from .api import list_payload
+    return list_payload(request)
+
+
+async def story_entries(request):
+    """StoryEntryViewSet's list endpoint, for JSON clients."""
+    wants_json = request.get_preferred_type(['application/json', 'text/html']) == 'application/json'
+    if request.method != 'GET' or 'format' in request.GET or not wants_json:
+        return await sync_to_async(_drf_list)(request)
+
+    stats = await StoryEntry.objects.aaggregate(**api_etag_aggregates())
+    etag = api_etag(stats, 'json', request)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        data = await aget_api_payload(etag, partial(sync_to_async(_list_payload), request))
+        response = JsonResponse(data)
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept'])
+    patch_cache_control(response, public=True, max_age=settings.STORY_API_MAX_AGE)
+    return response
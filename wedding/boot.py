@@ -0,0 +1,185 @@
+"""
+Container startup: make sure the database is ready before serving.
+
+Running ``migrate`` on every start costs seconds even when there is
+nothing to do: it imports every migration and rebuilds the project state.
+``boot`` checks first with one query, fetching the applied migrations
+and whether any story entries exist, and compares them with the
+migration files on disk. Only a mismatch runs ``migrate``, and only an
+empty story table loads the fixture.
+
+After a successful start the schema fingerprint (migration file names
+plus database identity) is written to ``BOOT_STATE_PATH``. A restart of
+the same container that finds a matching fingerprint trusts it and only
+checks that the database answers and has story entries, which is still
+a single query.
+
+``warm_up`` loads what Django otherwise loads on the first request; the
+gunicorn master calls it after preloading the app, so workers fork warm.
+"""
+
+import hashlib
+import json
+import os
+import pkgutil
+import time
+from collections import namedtuple
+from importlib import import_module
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.migrations.loader import MigrationLoader
+from django.template import engines
+from django.urls import get_resolver
+
+STORY_FIXTURE = 'wedding/fixtures/story_entries_backup.json'
+
+# migrated: every migration on disk is applied; has_stories: the story
+# table has rows (None if it couldn't be checked)
+Readiness = namedtuple('Readiness', 'migrated has_stories')
+
+
+class BootTimer:
+    """Collects (phase, seconds) pairs for the startup report."""
+
+    def __init__(self, started=None):
+        self.phases = []
+        self._started = time.perf_counter() if started is None else started
+
+    def phase(self, name, started):
+        self.phases.append((name, time.perf_counter() - started))
+
+    def skip(self, name):
+        self.phases.append((name, None))
+
+    def report(self):
+        parts = [f"{name} {'skipped' if seconds is None else f'{seconds:.2f}s'}" for name, seconds in self.phases]
+        parts.append(f"total {time.perf_counter() - self._started:.2f}s")
+        return ', '.join(parts)
+
+
+def disk_migrations():
+    """(app_label, name) of every migration file shipped with the installed apps."""
+    migrations = set()
+    for app_config in apps.get_app_configs():
+        module_name, _ = MigrationLoader.migrations_module(app_config.label)
+        if module_name is None:
+            continue
+        try:
+            module = import_module(module_name)
+        except ModuleNotFoundError:
+            continue
+        if not hasattr(module, '__path__'):
+            continue
+        for _, name, is_pkg in pkgutil.iter_modules(module.__path__):
+            if not is_pkg and name[0] not in '_~':
+                migrations.add((app_config.label, name))
+    return migrations
+
+
+def schema_fingerprint(migrations):
+    database = settings.DATABASES['default']
+    identity = [database.get('ENGINE'), database.get('HOST'), database.get('PORT'), str(database.get('NAME'))]
+    payload = json.dumps([identity, sorted(migrations)])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _story_table():
+    return connection.ops.quote_name(apps.get_model('wedding', 'StoryEntry')._meta.db_table)
+
+
+def check_ready(migrations, trusted=False):
+    """One query: are ``migrations`` all applied, and are there story entries?
+
+    With ``trusted`` (the cached fingerprint matched) the migrations are
+    taken as applied and only the story table is queried. Any database
+    error means not ready, so the full path runs and reports it properly.
+    """
+    try:
+        with connection.cursor() as cursor:
+            if trusted:
+                cursor.execute(f"SELECT EXISTS(SELECT 1 FROM {_story_table()})")
+                return Readiness(True, bool(cursor.fetchone()[0]))
+            cursor.execute(
+                f"SELECT app, name, EXISTS(SELECT 1 FROM {_story_table()}) "
+                f"FROM {connection.ops.quote_name('django_migrations')}"
+            )
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return Readiness(False, None)
+    if not rows:
+        return Readiness(False, None)
+    applied = {(app, name) for app, name, _ in rows}
+    return Readiness(migrations <= applied, bool(rows[0][2]))
+
+
+def _read_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f).get('fingerprint')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _write_state(path, fingerprint):
+    tmp = f'{path}.tmp'
+    try:
+        with open(tmp, 'w') as f:
+            json.dump({'fingerprint': fingerprint}, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # Only a cache; the next start does the full check
+
+
+def boot(full=False, timer=None, stdout=print):
+    """Bring the database up to date if needed; returns the BootTimer.
+
+    ``full`` skips the checks and always migrates, like the old startup.
+    """
+    timer = timer or BootTimer()
+    state_path = settings.BOOT_STATE_PATH
+
+    started = time.perf_counter()
+    migrations = disk_migrations()
+    fingerprint = schema_fingerprint(migrations)
+    trusted = not full and _read_state(state_path) == fingerprint
+    timer.phase('fingerprint', started)
+
+    if full:
+        readiness = Readiness(False, None)
+        timer.skip('check')
+    else:
+        started = time.perf_counter()
+        readiness = check_ready(migrations, trusted=trusted)
+        timer.phase('check (cached)' if trusted else 'check', started)
+
+    if readiness.migrated:
+        timer.skip('migrate')
+    else:
+        started = time.perf_counter()
+        call_command('migrate', run_syncdb=True, interactive=False, verbosity=1)
+        timer.phase('migrate', started)
+
+    has_stories = readiness.has_stories
+    if has_stories is None:
+        has_stories = apps.get_model('wedding', 'StoryEntry').objects.exists()
+    if has_stories:
+        timer.skip('fixtures')
+    else:
+        started = time.perf_counter()
+        stdout("No story entries found, loading fixture...")
+        call_command('loaddata', STORY_FIXTURE, verbosity=1)
+        timer.phase('fixtures', started)
+
+    _write_state(state_path, fingerprint)
+    return timer
+
+
+def warm_up():
+    """Load the URLconf and template engines (every app's template tags); returns seconds taken."""
+    started = time.perf_counter()
+    get_resolver().url_patterns
+    engines.all()
+    return time.perf_counter() - started
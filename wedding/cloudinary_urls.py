@@ -0,0 +1,80 @@
+"""
+Cloudinary delivery URLs.
+
+Every image on the site is a transformation URL over a public_id. These
+helpers build them in one place, from the configured cloud name, and
+memoize the results: the same few hundred public_ids are rendered over
+and over, so each URL and srcset string is built once per process. The
+memos are cleared when a setting they read changes (in tests).
+"""
+
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+DEFAULT_TRANSFORMATION = 'q_auto,f_auto'
+
+
+def delivery_base(resource_type='image'):
+    return f"https://res.cloudinary.com/{settings.CLOUDINARY_STORAGE['CLOUD_NAME']}/{resource_type}/upload"
+
+
+@lru_cache(maxsize=4096)
+def cloudinary_url(public_id, width=None, dpr=None, transformation=DEFAULT_TRANSFORMATION, resource_type='image'):
+    """URL for ``public_id`` limited to ``width`` pixels (never upscaled)."""
+    parts = []
+    if width:
+        parts += ['c_limit', f'w_{width}']
+    if dpr and dpr != 1:
+        parts.append(f'dpr_{dpr:.1f}')
+    if transformation:
+        parts.append(transformation)
+    path = ','.join(parts)
+    return f"{delivery_base(resource_type)}/{path + '/' if path else ''}{public_id}"
+
+
+@lru_cache(maxsize=256)
+def responsive_widths(max_width, intrinsic_width=None):
+    """``CLOUDINARY_BREAKPOINTS`` up to ``max_width``, capped at the original's width."""
+    limit = min(max_width, intrinsic_width) if intrinsic_width else max_width
+    return tuple(w for w in settings.CLOUDINARY_BREAKPOINTS if w < limit) + (limit,)
+
+
+@lru_cache(maxsize=2048)
+def srcset(public_id, max_width, intrinsic_width=None):
+    """Width-descriptor srcset (``... 320w, ... 640w``) for fluid images."""
+    return ', '.join(
+        f"{cloudinary_url(public_id, width)} {width}w"
+        for width in responsive_widths(max_width, intrinsic_width)
+    )
+
+
+@lru_cache(maxsize=1024)
+def dpr_srcset(public_id, width):
+    """Density-descriptor srcset (``... 1x, ... 2x``) for fixed-size images."""
+    return ', '.join(
+        f"{cloudinary_url(public_id, width, dpr=dpr)} {dpr}x"
+        for dpr in settings.CLOUDINARY_DPRS
+    )
+
+
+def scaled_size(width, height, max_width):
+    """(width, height) of an image shown at most ``max_width`` wide, keeping its aspect ratio."""
+    if not width or not height:
+        return None, None
+    if width <= max_width:
+        return width, height
+    return max_width, round(height * max_width / width)
+
+
+def clear_caches():
+    for builder in (cloudinary_url, responsive_widths, srcset, dpr_srcset):
+        builder.cache_clear()
+
+
+@receiver(setting_changed)
+def _settings_changed(setting, **kwargs):
+    if setting in ('CLOUDINARY_STORAGE', 'CLOUDINARY_BREAKPOINTS', 'CLOUDINARY_DPRS'):
+        clear_caches()
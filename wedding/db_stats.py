@@ -0,0 +1,65 @@
+"""
+Database connection metrics for the current process.
+
+``connects`` counts Django connecting to a database. With persistent
+connections that is a new physical connection, so it should level off
+around the number of worker threads. A count that keeps climbing means
+connections are being dropped: failed health checks, or
+``DB_CONN_MAX_AGE`` too short. In pooled mode every request checks a
+connection out and counts once. The pool's own counters then show how
+many checkouts had to wait, for how long, and how many connections it
+holds.
+"""
+
+import os
+import threading
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_connects = Counter()
+_lock = threading.Lock()
+
+
+@receiver(connection_created)
+def count_connect(sender, connection, **kwargs):
+    with _lock:
+        _connects[connection.alias] += 1
+
+
+def pool_stats(pool):
+    """The counters we report from a psycopg ConnectionPool's ``get_stats()``."""
+    stats = pool.get_stats()
+    return {
+        'checkouts': stats.get('requests_num', 0),
+        # Checkouts that found no free connection and had to queue
+        'waits': stats.get('requests_queued', 0),
+        'wait_ms': stats.get('requests_wait_ms', 0),
+        # Checkouts that gave up after the pool timeout
+        'timeouts': stats.get('requests_errors', 0),
+        'size': stats['pool_size'],
+        'available': stats['pool_available'],
+        'min_size': stats['pool_min'],
+        'max_size': stats['pool_max'],
+        'opened': stats.get('connections_num', 0),
+        'lost': stats.get('connections_lost', 0),
+    }
+
+
+def connection_stats(alias=DEFAULT_DB_ALIAS):
+    """Connection mode and counters for ``alias`` in this process."""
+    connection = connections[alias]
+    settings_dict = connection.settings_dict
+    pooled = bool(settings_dict.get('OPTIONS', {}).get('pool'))
+    if pooled:
+        mode = 'pool'
+    elif settings_dict.get('CONN_MAX_AGE'):
+        mode = 'persistent'
+    else:
+        mode = 'per-request'
+    stats = {'pid': os.getpid(), 'alias': alias, 'vendor': connection.vendor, 'mode': mode, 'connects': _connects[alias]}
+    if pooled:
+        stats.update(pool_stats(connection.pool))
+    return stats
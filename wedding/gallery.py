@@ -0,0 +1,85 @@
+"""
+Photo gallery backed by ``scripts/cloudinary_manifest.json``.
+
+The upload script records every photo's public_id and dimensions in the
+manifest, along with a tiny inline placeholder for each. ``get_gallery()``
+parses it once into immutable albums, indexed by slug and by position,
+and re-reads it only when the file's mtime changes, so a fresh upload
+shows up without a restart.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+
+Photo = namedtuple('Photo', 'id public_id width height bytes placeholder')
+Album = namedtuple('Album', 'slug name photos')
+
+
+def _natural_key(value):
+    """Sort "K_and_J_2" before "K_and_J_10"."""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', value)]
+
+
+class Gallery:
+    def __init__(self, albums, version, by_public_id=None):
+        self.albums = albums
+        self.by_slug = {album.slug: album for album in albums}
+        self.version = version
+        # Every manifest entry, gallery or not
+        self.by_public_id = by_public_id or {}
+
+    @classmethod
+    def from_manifest(cls, manifest, album_configs, version=''):
+        """Group manifest entries under ``<GALLERY_MANIFEST_PREFIX><slug>/``."""
+        photos = {slug: [] for slug, _name in album_configs}
+        by_public_id = {}
+        for key, entry in manifest.items():
+            photo = Photo(
+                entry['public_id'].rsplit('/', 1)[-1], entry['public_id'], entry.get('width'),
+                entry.get('height'), entry.get('bytes'), entry.get('placeholder', ''),
+            )
+            by_public_id[photo.public_id] = photo
+            album_key, _, _filename = key.rpartition('/')
+            slug = album_key[len(settings.GALLERY_MANIFEST_PREFIX):]
+            if album_key.startswith(settings.GALLERY_MANIFEST_PREFIX) and slug in photos:
+                photos[slug].append(photo)
+        albums = tuple(
+            Album(slug, name, tuple(sorted(photos[slug], key=lambda p: _natural_key(p.id))))
+            for slug, name in album_configs
+        )
+        return cls(albums, version, by_public_id)
+
+    def page(self, slug, offset, limit):
+        """Photos ``offset:offset + limit`` of an album; KeyError for unknown slugs."""
+        return self.by_slug[slug].photos[offset:offset + limit]
+
+
+_gallery = None
+_gallery_key = None
+_lock = threading.Lock()
+
+
+def get_gallery():
+    """The current Gallery, reloaded if the manifest file has changed."""
+    global _gallery, _gallery_key
+    path = settings.GALLERY_MANIFEST_PATH
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+    if _gallery is None or (path, mtime) != _gallery_key:
+        with _lock:
+            if _gallery is None or (path, mtime) != _gallery_key:
+                try:
+                    with open(path) as f:
+                        manifest = json.load(f)
+                except (OSError, ValueError):
+                    manifest = {}
+                _gallery = Gallery.from_manifest(manifest, settings.GALLERY_ALBUMS, version=str(mtime))
+                _gallery_key = (path, mtime)
+    return _gallery
@@ -0,0 +1,79 @@
+"""
+Import-time profile of Django startup, per installed app.
+
+Runs ``django.setup()`` (and optionally the URLconf and extra modules)
+in a fresh interpreter under ``python -X importtime`` and totals the
+result. Each module's own import time is charged to the outermost
+installed app on its import chain, so a library that ``wedding.views``
+pulls in counts against ``wedding``; imports no app triggered are
+charged to the package itself.
+"""
+
+import os
+import re
+import subprocess
+import sys
+from collections import Counter, namedtuple
+
+# "import time: self [us] | cumulative | imported package"
+LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+ImportRecord = namedtuple('ImportRecord', 'module self_us cumulative_us depth')
+# by_app: owner -> microseconds; by_package: top-level package -> self microseconds
+ImportProfile = namedtuple('ImportProfile', 'total_us by_app by_package')
+
+
+def parse(lines):
+    """ImportRecords from ``-X importtime`` stderr lines, in the order Python printed them."""
+    records = []
+    for line in lines:
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(ImportRecord(module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return records
+
+
+def _owner(module, app_names):
+    for name in app_names:
+        if module == name or module.startswith(name + '.'):
+            return name
+    return None
+
+
+def summarize(records, app_names):
+    """ImportProfile of ``records``, charging imports to the apps in ``app_names``."""
+    # Longest names first so 'django.contrib.admin' wins over a bare 'django'
+    app_names = sorted(app_names, key=len, reverse=True)
+    by_app = Counter()
+    by_package = Counter()
+    # Python prints each module after the ones it imported; walking the
+    # list backwards visits every parent before its children.
+    chain = []
+    for record in reversed(records):
+        del chain[record.depth:]
+        chain.append(record.module)
+        owner = next(filter(None, (_owner(module, app_names) for module in chain)), None)
+        top_level = record.module.split('.')[0]
+        by_app[owner or top_level] += record.self_us
+        by_package[top_level] += record.self_us
+    return ImportProfile(sum(by_package.values()), by_app, by_package)
+
+
+def startup_script(urls=False, modules=()):
+    lines = ['import django', 'django.setup()']
+    if urls:
+        lines += ['from django.urls import get_resolver', 'get_resolver().url_patterns']
+    lines += [f'import {module}' for module in modules]
+    return '\n'.join(lines)
+
+
+def profile_imports(app_names, urls=False, modules=(), python=sys.executable):
+    """Run the startup script under ``-X importtime``; raise RuntimeError if it fails."""
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', startup_script(urls, modules)],
+        capture_output=True, text=True, env=os.environ.copy(),
+    )
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'startup failed')
+    return summarize(parse(result.stderr.splitlines()), app_names)
@@ -0,0 +1,52 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from wedding.importtime import profile_imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile how long a cold django.setup() spends importing, per installed app "
+        "(python -X importtime in a fresh interpreter). Use it to catch startup "
+        "regressions in workers and management commands."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--urls', action='store_true', help='Also load the URLconf, as the first request does.')
+        parser.add_argument(
+            '--module',
+            action='append',
+            default=[],
+            help='Also import this module (repeatable), e.g. wedding.api.',
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Runs to take the fastest of (default: 3).')
+        parser.add_argument('--top', type=int, default=10, help='Rows per table (default: 10).')
+        parser.add_argument(
+            '--budget',
+            type=float,
+            default=None,
+            help='Fail if the total import time exceeds this many milliseconds.',
+        )
+
+    def handle(self, *args, **options):
+        app_names = [app_config.name for app_config in apps.get_app_configs()]
+        try:
+            runs = [
+                profile_imports(app_names, urls=options['urls'], modules=options['module'])
+                for _ in range(max(1, options['repeat']))
+            ]
+        except RuntimeError as exc:
+            raise CommandError(f"Startup failed: {exc}")
+        profile = min(runs, key=lambda run: run.total_us)
+
+        self.table("Import time by app", profile.by_app, options['top'])
+        self.table("Slowest packages (own time)", profile.by_package, options['top'])
+        total_ms = profile.total_us / 1000
+        self.stdout.write(f"Total: {total_ms:.1f} ms")
+        if options['budget'] is not None and total_ms > options['budget']:
+            raise CommandError(f"Import time {total_ms:.1f} ms is over the {options['budget']:.0f} ms budget")
+
+    def table(self, title, counts, top):
+        self.stdout.write(title)
+        for name, us in counts.most_common(top):
+            self.stdout.write(f"  {name:<32} {us / 1000:8.1f} ms")
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from wedding.prerender import brotli, render_pages
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the static wedding pages to HTML with gzip/brotli variants "
+        "for PrerenderedPageMiddleware. Run after collectstatic on each deploy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=settings.PRERENDERED_PAGES_DIR,
+            help='Directory to write pages to (default: PRERENDERED_PAGES_DIR).',
+        )
+
+    def handle(self, *args, **options):
+        if brotli is None:
+            self.stdout.write(self.style.WARNING("brotli is not installed; writing gzip variants only."))
+
+        manifest = render_pages(options['output'], settings.PRERENDERED_PAGES)
+        for path, entry in manifest.items():
+            sizes = ', '.join(f"{enc} {size / 1024:.1f} KB" for enc, size in sorted(entry['sizes'].items()))
+            self.stdout.write(f"  {path} -> {entry['file']} ({sizes})")
+        self.stdout.write(self.style.SUCCESS(f"Pre-rendered {len(manifest)} pages to {options['output']}"))
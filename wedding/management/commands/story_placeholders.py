@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from wedding.models import IMAGE_INFO_FIELDS, StoryEntry
+from wedding.placeholders import fetch_placeholder
+from wedding.story_cache import invalidate
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill in missing StoryEntry image placeholders, from the Cloudinary "
+        "manifest where possible and otherwise from a small Cloudinary rendition."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every placeholder, not just the missing ones.',
+        )
+
+    def handle(self, *args, **options):
+        entries = StoryEntry.objects.only('image', 'updated_at', *IMAGE_INFO_FIELDS)
+        if not options['all']:
+            entries = entries.filter(image_placeholder='')
+
+        updated = []
+        for entry in entries:
+            before = [getattr(entry, name) for name in IMAGE_INFO_FIELDS]
+            if options['all']:
+                entry.image_placeholder = ''
+            entry.copy_image_info()
+            if not entry.image_placeholder:
+                entry.image_placeholder = fetch_placeholder(str(entry.image))
+            if not entry.image_placeholder:
+                self.stdout.write(self.style.WARNING(f"  no placeholder for {entry.image}"))
+            if [getattr(entry, name) for name in IMAGE_INFO_FIELDS] != before:
+                entry.updated_at = timezone.now()
+                updated.append(entry)
+
+        # bulk_update skips save() and its signals, so drop the cached timeline by hand
+        StoryEntry.objects.bulk_update(updated, IMAGE_INFO_FIELDS + ['updated_at'])
+        if updated:
+            invalidate()
+        self.stdout.write(self.style.SUCCESS(f"Updated {len(updated)} story placeholders"))
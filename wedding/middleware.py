@@ -0,0 +1,56 @@
+"""
+WhiteNoise that runs natively under ASGI as well as WSGI.
+
+WhiteNoise's middleware is sync only. Under ASGI, Django would adapt
+everything inside it to sync as well, so each request would hold a
+thread until its async view finished. This subclass runs in either
+mode. Under ASGI it awaits the rest of the chain, and streams static
+files through the event loop in chunks. Without that, Django would read
+the whole file into memory and warn.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import FileResponse
+from whitenoise.middleware import WhiteNoiseFileResponse
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+
+async def _file_chunks(file, block_size=FileResponse.block_size):
+    if file is None:
+        return
+    try:
+        while chunk := await sync_to_async(file.read, thread_sensitive=False)(block_size):
+            yield chunk
+    finally:
+        file.close()
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+
+        response = static_file.get_response(request.method, request.META)
+        http_response = WhiteNoiseFileResponse(_file_chunks(response.file), status=int(response.status))
+        del http_response['content-type']
+        for key, value in response.headers:
+            http_response[key] = value
+        return http_response
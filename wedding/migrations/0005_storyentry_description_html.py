@@ -0,0 +1,96 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:43
+
+from html import escape
+from html.parser import HTMLParser
+
+from django.db import migrations, models
+
+# A frozen copy of wedding.sanitizer as of this migration, so the backfill
+# gives the same result however that module changes later
+ALLOWED_TAGS = {'p', 'br', 'strong', 'b', 'em', 'i', 'u', 's', 'ol', 'ul', 'li', 'a', 'blockquote'}
+VOID_TAGS = {'br'}
+# Content of these is dropped entirely, not just the tags
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'template'}
+SAFE_URL_SCHEMES = ('http://', 'https://', 'mailto:', '/', '#')
+
+
+class _Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        rendered = tag
+        if tag == 'a':
+            href = dict(attrs).get('href') or ''
+            if href.strip().lower().startswith(SAFE_URL_SCHEMES):
+                rendered += f' href="{escape(href.strip())}" rel="noopener noreferrer"'
+        self.parts.append(f'<{rendered}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in self.open_tags and tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # Close anything left open inside this tag so the output stays balanced
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.parts.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.parts.append(escape(data, quote=False))
+
+    def result(self):
+        self.close()
+        self.parts.extend(f'</{tag}>' for tag in reversed(self.open_tags))
+        return ''.join(self.parts)
+
+
+def sanitize_html(value):
+    if not value:
+        return ''
+    parser = _Sanitizer()
+    parser.feed(value)
+    return parser.result()
+
+
+def forwards(apps, schema_editor):
+    StoryEntry = apps.get_model('wedding', 'StoryEntry')
+    entries = list(StoryEntry.objects.only('description'))
+    for entry in entries:
+        entry.description_html = sanitize_html(entry.description)
+    StoryEntry.objects.bulk_update(entries, ['description_html'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wedding', '0004_migrate_story_images_to_cloudinary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storyentry',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wedding', '0005_storyentry_description_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storyentry',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
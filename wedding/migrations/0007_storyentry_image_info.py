@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wedding', '0006_storyentry_updated_at'),
+    ]
+
+    # Schema only: 0008 backfills existing entries from the manifest
+    operations = [
+        migrations.AddField(
+            model_name='storyentry',
+            name='image_height',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='storyentry',
+            name='image_placeholder',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='storyentry',
+            name='image_width',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+import json
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+
+def forwards(apps, schema_editor):
+    # Entries saved before 0007 have no image info yet. Copy it from the
+    # Cloudinary manifest, as StoryEntry.save() does; images uploaded
+    # through the admin aren't in it and are left to
+    # `manage.py story_placeholders`, which fetches from Cloudinary.
+    try:
+        with open(settings.GALLERY_MANIFEST_PATH) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return
+    by_public_id = {entry['public_id']: entry for entry in manifest.values()}
+
+    StoryEntry = apps.get_model('wedding', 'StoryEntry')
+    updated = []
+    for entry in StoryEntry.objects.filter(image_placeholder='').only('image'):
+        photo = by_public_id.get(str(entry.image))
+        if photo is None:
+            continue
+        entry.image_width = photo.get('width')
+        entry.image_height = photo.get('height')
+        entry.image_placeholder = photo.get('placeholder', '')
+        entry.updated_at = timezone.now()
+        updated.append(entry)
+    StoryEntry.objects.bulk_update(
+        updated, ['image_width', 'image_height', 'image_placeholder', 'updated_at']
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wedding', '0007_storyentry_image_info'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
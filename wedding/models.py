@@ -1,17 +1,58 @@
 from django.db import models
+from django.utils import timezone
 from ckeditor.fields import RichTextField
 from cloudinary.models import CloudinaryField
 
+from .gallery import get_gallery
+from .sanitizer import sanitize_html
+
+IMAGE_INFO_FIELDS = ['image_width', 'image_height', 'image_placeholder']
+
+
 class StoryEntry(models.Model):
     title = models.CharField(max_length=255)
     subtitle = models.CharField(max_length=225, blank=True, null=True)
     date = models.DateField()
     description = RichTextField()
+    # Sanitized copy of description, rendered once on save for the public pages
+    description_html = models.TextField(blank=True, editable=False)
     image = CloudinaryField('image')
+    # Copied from the Cloudinary manifest on save: the original's size and
+    # an inline LQIP data URI, so cards hold their shape while loading
+    image_width = models.PositiveIntegerField(null=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
+    # Feeds the API's ETag; set in save() rather than auto_now so fixtures load
+    updated_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         ordering = ['date']
         verbose_name_plural = "Story Entries"
 
     def __str__(self):
-        return f"{self.date} - {self.title}"
\ No newline at end of file
+        return f"{self.date} - {self.title}"
+
+    def copy_image_info(self):
+        """Fill the image_* fields from the manifest entry for this image, if any.
+
+        Images uploaded through the admin aren't in the manifest; the
+        story_placeholders command fetches their placeholders from Cloudinary.
+        """
+        photo = get_gallery().by_public_id.get(str(self.image))
+        if photo is not None:
+            self.image_width, self.image_height = photo.width, photo.height
+            self.image_placeholder = photo.placeholder or self.image_placeholder
+
+    def save(self, *args, **kwargs):
+        self.description_html = sanitize_html(self.description)
+        self.copy_image_info()
+        self.updated_at = timezone.now()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields) | {'updated_at'}
+            if 'description' in update_fields:
+                update_fields.add('description_html')
+            if 'image' in update_fields:
+                update_fields |= set(IMAGE_INFO_FIELDS)
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
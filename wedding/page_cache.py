@@ -0,0 +1,104 @@
+"""
+Full-response caching for the wedding app's static pages.
+
+Pages like home and the FAQ only change on deploy, so the rendered bytes
+are stored in the ``PAGE_CACHE_ALIAS`` cache (file-based by default, so
+every gunicorn worker shares one copy) under a key that includes the
+deploy version. A new deploy therefore never serves stale HTML. Responses
+carry a strong ETag and Last-Modified, and conditional requests get a 304.
+"""
+
+import hashlib
+import time
+from functools import lru_cache, wraps
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+@lru_cache(maxsize=1)
+def deploy_version():
+    """Short hash of DEPLOY_VERSION plus the collectstatic manifest, if present."""
+    digest = hashlib.sha256(settings.DEPLOY_VERSION.encode())
+    manifest = Path(settings.STATIC_ROOT) / 'staticfiles.json'
+    try:
+        digest.update(manifest.read_bytes())
+    except OSError:
+        pass
+    return digest.hexdigest()[:12]
+
+
+def page_cache_key(path):
+    # The query string is deliberately ignored: these pages don't read it,
+    # and shared links arrive with tracking parameters attached.
+    return f"page:{deploy_version()}:{path}"
+
+
+def _cacheable(request):
+    return settings.PAGE_CACHE_ENABLED and request.method in ('GET', 'HEAD')
+
+
+def _cache_entry(response):
+    """What the page cache stores for ``response``, or None if it shouldn't be cached."""
+    if response.status_code != 200 or response.streaming:
+        return None
+    etag = quote_etag(hashlib.sha256(response.content).hexdigest()[:32])
+    return (response.content, response['Content-Type'], etag, int(time.time()))
+
+
+def _cached_response(request, entry):
+    content, content_type, etag, last_modified = entry
+    response = HttpResponse(content, content_type=content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=settings.PAGE_CACHE_MAX_AGE)
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=response
+    )
+
+
+def cached_page(view):
+    """Serve ``view`` from the page cache, answering conditional GETs with 304.
+
+    Works on sync and async views alike.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not _cacheable(request):
+                return await view(request, *args, **kwargs)
+            cache = caches[settings.PAGE_CACHE_ALIAS]
+            key = page_cache_key(request.path)
+            entry = await cache.aget(key)
+            if entry is None:
+                response = await view(request, *args, **kwargs)
+                entry = _cache_entry(response)
+                if entry is None:
+                    return response
+                await cache.aset(key, entry, settings.PAGE_CACHE_TIMEOUT)
+            return _cached_response(request, entry)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _cacheable(request):
+            return view(request, *args, **kwargs)
+        cache = caches[settings.PAGE_CACHE_ALIAS]
+        key = page_cache_key(request.path)
+        entry = cache.get(key)
+        if entry is None:
+            response = view(request, *args, **kwargs)
+            entry = _cache_entry(response)
+            if entry is None:
+                return response
+            cache.set(key, entry, settings.PAGE_CACHE_TIMEOUT)
+        return _cached_response(request, entry)
+
+    return wrapper
@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class StoryEntryCursorPagination(CursorPagination):
+    """Stable cursor paging in timeline order; cursors stay valid as entries are added."""
+    ordering = ('date', 'id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
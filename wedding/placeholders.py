@@ -0,0 +1,47 @@
+"""
+Low-quality image placeholders (LQIP).
+
+A placeholder is the image shrunk to a few pixels and stored as a base64
+WebP data URI, a couple of hundred bytes that can be inlined into the
+page and stretched behind the real image while it loads. The upload
+script computes one per file into the Cloudinary manifest; StoryEntry
+copies its own from there (or from Cloudinary, for images uploaded
+through the admin).
+"""
+
+import base64
+import logging
+from io import BytesIO
+from urllib.request import urlopen
+
+from PIL import Image
+
+from .cloudinary_urls import cloudinary_url
+
+logger = logging.getLogger(__name__)
+
+# Longest side, in pixels
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 40
+
+
+def make_placeholder(image):
+    """Data URI for a PIL image (the image itself is left untouched)."""
+    small = image.copy()
+    small.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.LANCZOS)
+    if small.mode not in ('RGB', 'RGBA'):
+        small = small.convert('RGBA' if 'transparency' in small.info or small.mode in ('LA', 'PA') else 'RGB')
+    buf = BytesIO()
+    small.save(buf, format='WEBP', quality=PLACEHOLDER_QUALITY, method=6)
+    return 'data:image/webp;base64,' + base64.b64encode(buf.getvalue()).decode('ascii')
+
+
+def fetch_placeholder(public_id, timeout=10):
+    """Placeholder built from a small Cloudinary rendition; '' if it can't be fetched."""
+    url = cloudinary_url(public_id, PLACEHOLDER_SIZE * 4, transformation='f_png')
+    try:
+        with urlopen(url, timeout=timeout) as response:
+            return make_placeholder(Image.open(BytesIO(response.read())))
+    except (OSError, ValueError) as exc:
+        logger.warning("Could not build a placeholder for %s: %s", public_id, exc)
+        return ''
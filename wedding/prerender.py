@@ -0,0 +1,150 @@
+"""
+Pre-rendered, pre-compressed copies of the static wedding pages.
+
+``manage.py prerender_pages`` renders every page named in
+``PRERENDERED_PAGES`` once at build time. It writes the HTML plus gzip and
+(when the optional ``brotli`` package is installed) brotli variants to
+``PRERENDERED_PAGES_DIR`` with a ``manifest.json`` index.
+``PrerenderedPageMiddleware`` loads those bytes into memory at startup
+and answers matching GET/HEAD requests without calling the views.
+"""
+
+import gzip
+import hashlib
+import json
+import re
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.urls import resolve, reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+try:
+    import brotli
+except ImportError:  # optional; gzip-only without it
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+
+# Preferred first; identity is always available
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def render_pages(output_dir, url_names):
+    """Render ``url_names`` into ``output_dir``; returns the manifest written."""
+    # Build time only: importing django.test at module level would load the
+    # test framework into every web worker through the middleware
+    from django.test import RequestFactory
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    factory = RequestFactory()
+    manifest = {}
+
+    for name in url_names:
+        path = reverse(name)
+        match = resolve(path)
+        view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+        response = view(factory.get(path), *match.args, **match.kwargs)
+        if response.status_code != 200:
+            raise ValueError(f"{name} ({path}) rendered with status {response.status_code}")
+        content = response.content
+
+        filename = (path.strip('/').replace('/', '__') or 'index') + '.html'
+        variants = {'identity': content, 'gzip': gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(content, quality=11)
+
+        (output_dir / filename).write_bytes(content)
+        for encoding, suffix in ENCODINGS:
+            if encoding in variants:
+                (output_dir / (filename + suffix)).write_bytes(variants[encoding])
+
+        manifest[path] = {
+            'file': filename,
+            'content_type': response['Content-Type'],
+            'etag': hashlib.sha256(content).hexdigest()[:32],
+            'encodings': sorted(variants),
+            'sizes': {encoding: len(body) for encoding, body in variants.items()},
+        }
+
+    (output_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+class PrerenderedPageMiddleware:
+    """Serve pre-rendered pages straight from memory.
+
+    Sits at the end of MIDDLEWARE so security, session and clickjacking
+    headers are still applied, but the view and template layers are
+    skipped entirely. Removes itself when disabled or nothing was rendered.
+    Runs natively under both WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.PRERENDERED_PAGES_ENABLED:
+            raise MiddlewareNotUsed
+        self.pages = self.load(settings.PRERENDERED_PAGES_DIR)
+        if not self.pages:
+            raise MiddlewareNotUsed
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def load(directory):
+        directory = Path(directory)
+        try:
+            manifest = json.loads((directory / MANIFEST_NAME).read_text())
+        except (OSError, ValueError):
+            return {}
+        mtime = int((directory / MANIFEST_NAME).stat().st_mtime)
+        pages = {}
+        for path, entry in manifest.items():
+            bodies = {'identity': (directory / entry['file']).read_bytes()}
+            for encoding, suffix in ENCODINGS:
+                if encoding in entry['encodings']:
+                    bodies[encoding] = (directory / (entry['file'] + suffix)).read_bytes()
+            pages[path] = (entry['content_type'], entry['etag'], mtime, bodies)
+        return pages
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.serve(request)
+        return self.get_response(request) if response is None else response
+
+    async def __acall__(self, request):
+        response = self.serve(request)
+        return await self.get_response(request) if response is None else response
+
+    def serve(self, request):
+        """The pre-rendered response for ``request``, or None to fall through to the view."""
+        page = self.pages.get(request.path)
+        if page is None or request.method not in ('GET', 'HEAD'):
+            return None
+
+        content_type, etag, last_modified, bodies = page
+        accept = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        encoding = 'identity'
+        for candidate, _suffix in ENCODINGS:
+            if candidate in bodies and re.search(rf'\b{candidate}\b', accept):
+                encoding = candidate
+                break
+
+        # Each encoding is a different byte stream, so it needs its own strong ETag
+        tag = quote_etag(etag if encoding == 'identity' else f"{etag}-{encoding}")
+        response = HttpResponse(bodies[encoding], content_type=content_type)
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+        response['ETag'] = tag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        patch_cache_control(response, public=True, max_age=settings.PAGE_CACHE_MAX_AGE)
+        return get_conditional_response(request, etag=tag, last_modified=last_modified, response=response)
@@ -0,0 +1,76 @@
+"""
+Allow-list HTML sanitizer for CKEditor story descriptions.
+
+The admin toolbar only offers bold/italic/underline, lists and links,
+but its Source button lets anything through. Descriptions are cleaned
+once when an entry is saved, so the public pages and the modal (which
+assigns ``innerHTML``) only ever see this reduced markup.
+"""
+
+from html import escape
+from html.parser import HTMLParser
+
+ALLOWED_TAGS = {'p', 'br', 'strong', 'b', 'em', 'i', 'u', 's', 'ol', 'ul', 'li', 'a', 'blockquote'}
+VOID_TAGS = {'br'}
+# Content of these is dropped entirely, not just the tags
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'template'}
+SAFE_URL_SCHEMES = ('http://', 'https://', 'mailto:', '/', '#')
+
+
+class _Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        rendered = tag
+        if tag == 'a':
+            href = dict(attrs).get('href') or ''
+            if href.strip().lower().startswith(SAFE_URL_SCHEMES):
+                rendered += f' href="{escape(href.strip())}" rel="noopener noreferrer"'
+        self.parts.append(f'<{rendered}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in self.open_tags and tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # Close anything left open inside this tag so the output stays balanced
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.parts.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.parts.append(escape(data, quote=False))
+
+    def result(self):
+        self.close()
+        self.parts.extend(f'</{tag}>' for tag in reversed(self.open_tags))
+        return ''.join(self.parts)
+
+
+def sanitize_html(value):
+    """Return ``value`` reduced to the allowed tags, with text escaped."""
+    if not value:
+        return ''
+    parser = _Sanitizer()
+    parser.feed(value)
+    return parser.result()
@@ -2,18 +2,35 @@
 
 from rest_framework import serializers
 from django.conf import settings
+from .cloudinary_urls import cloudinary_url, srcset
 from .models import StoryEntry
 
-CLOUDINARY_BASE = f"https://res.cloudinary.com/{settings.CLOUDINARY_STORAGE['CLOUD_NAME']}/image/upload"
-
 class StoryEntrySerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
+    # The modal assigns this to innerHTML, so only ever send the sanitized copy
+    description = serializers.CharField(source='description_html', read_only=True)
 
     class Meta:
         model = StoryEntry
-        fields = '__all__'
+        exclude = ['description_html']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Sparse fieldsets: ?fields=id,title,image trims the payload
+        request = self.context.get('request')
+        requested = request.query_params.get('fields') if request is not None else None
+        if requested:
+            keep = {name.strip() for name in requested.split(',')}
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
 
     def get_image(self, obj):
         if not obj.image:
             return None
-        return f"{CLOUDINARY_BASE}/c_limit,w_1200,q_auto,f_auto/{obj.image}"
\ No newline at end of file
+        return cloudinary_url(str(obj.image), settings.STORY_IMAGE_MAX_WIDTH)
+
+    def get_image_srcset(self, obj):
+        if not obj.image:
+            return None
+        return srcset(str(obj.image), settings.STORY_IMAGE_MAX_WIDTH)
\ No newline at end of file
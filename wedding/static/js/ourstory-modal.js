@@ -12,7 +12,17 @@ document.addEventListener("DOMContentLoaded", () => {
     const res = await fetch(`/wedding/story-entries/${storyId}/`);
     const data = await res.json();
 
-    document.getElementById("modal-img").src = data.image;
+    const img = document.getElementById("modal-img");
+    img.style.background = data.image_placeholder
+      ? `url(${data.image_placeholder}) center / cover no-repeat`
+      : "";
+    img.onload = () => { img.style.background = ""; };
+    if (data.image_width) {
+      img.width = data.image_width;
+      img.height = data.image_height;
+    }
+    img.srcset = data.image_srcset || "";
+    img.src = data.image;
     document.getElementById("modal-title").textContent = data.title;
     document.getElementById("modal-subtitle").textContent = data.subtitle;
     document.getElementById("modal-date").textContent = new Date(
@@ -0,0 +1,126 @@
+"""
+Cached Our Story timeline.
+
+The rendered timeline grid is kept in the shared ``STORY_CACHE_ALIAS``
+cache until an entry is saved or deleted, at which point the signal
+receivers below drop it. StoryEntry API payloads are stored under their
+ETag, which already changes whenever an entry does. Entries change about
+once a month, so nearly every request is a cache hit.
+"""
+
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.http import quote_etag
+from django.utils.safestring import mark_safe
+
+from .models import IMAGE_INFO_FIELDS, StoryEntry
+from .page_cache import deploy_version
+from .sanitizer import sanitize_html
+
+
+def timeline_key():
+    return f"story:{deploy_version()}:timeline"
+
+
+# The query parameters the story API honours. Anything else is left out
+# of the ETag, so junk query strings can't fill the cache with copies.
+API_QUERY_PARAMS = ('cursor', 'page_size', 'fields', 'format')
+
+
+def api_etag_aggregates():
+    return {'count': Count('pk'), 'max_pk': Max('pk'), 'updated': Max('updated_at')}
+
+
+def api_request_key(request):
+    """The request's path and honoured query parameters, in a fixed order."""
+    params = [(name, request.GET[name]) for name in API_QUERY_PARAMS if name in request.GET]
+    return f"{request.path}?{urlencode(params)}"
+
+
+def api_etag(stats, renderer_format, request):
+    """Strong ETag from the ``api_etag_aggregates()`` of the queryset plus everything that shapes the body."""
+    raw = '|'.join([
+        deploy_version(),
+        str(stats['count']), str(stats['max_pk']), str(stats['updated']),
+        renderer_format, api_request_key(request),
+    ])
+    return quote_etag(hashlib.sha256(raw.encode()).hexdigest()[:32])
+
+
+def api_payload_key(etag):
+    return f"story:{deploy_version()}:api:" + etag.strip('"')
+
+
+def story_cache():
+    return caches[settings.STORY_CACHE_ALIAS]
+
+
+def get_timeline_html():
+    """Rendered timeline grid for our_story.html."""
+    html = story_cache().get(timeline_key())
+    if html is None:
+        html = render_to_string('wedding/partials/story_timeline.html', {
+            'story_entries': StoryEntry.objects.order_by('date'),
+        })
+        story_cache().set(timeline_key(), html, None)
+    return mark_safe(html)
+
+
+async def aget_timeline_html():
+    """get_timeline_html() for async views: cache and database calls are awaited."""
+    html = await story_cache().aget(timeline_key())
+    if html is None:
+        entries = [entry async for entry in StoryEntry.objects.order_by('date')]
+        html = render_to_string('wedding/partials/story_timeline.html', {'story_entries': entries})
+        await story_cache().aset(timeline_key(), html, None)
+    return mark_safe(html)
+
+
+def get_api_payload(etag, build):
+    """StoryEntryViewSet payload for ``etag``, built by ``build()`` on a miss."""
+    key = api_payload_key(etag)
+    data = story_cache().get(key)
+    if data is None:
+        data = build()
+        story_cache().set(key, data, settings.PAGE_CACHE_TIMEOUT)
+    return data
+
+
+async def aget_api_payload(etag, build):
+    """get_api_payload() for async views; ``build`` is a coroutine function."""
+    key = api_payload_key(etag)
+    data = await story_cache().aget(key)
+    if data is None:
+        data = await build()
+        await story_cache().aset(key, data, settings.PAGE_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate():
+    story_cache().delete(timeline_key())
+
+
+@receiver(post_save, sender=StoryEntry)
+def _story_entry_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        # loaddata skips save(), so fill in the derived fields here
+        instance.copy_image_info()
+        StoryEntry.objects.filter(pk=instance.pk).update(
+            description_html=sanitize_html(instance.description),
+            updated_at=timezone.now(),
+            **{name: getattr(instance, name) for name in IMAGE_INFO_FIELDS},
+        )
+    invalidate()
+
+
+@receiver(post_delete, sender=StoryEntry)
+def _story_entry_deleted(sender, instance, **kwargs):
+    invalidate()
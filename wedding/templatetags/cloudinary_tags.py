@@ -0,0 +1,70 @@
+"""
+Template tags for Cloudinary images.
+
+    {% load cloudinary_tags %}
+    {% cloudinary_url 'wedding-site/itinerary/Mountain' %}
+    {% cloudinary_img entry.image max_width=800 sizes="(min-width: 768px) 50vw, 100vw" alt=entry.title %}
+    {% cloudinary_fixed_img 'wedding-site/header/FandALogo' 128 alt="Logo" %}
+
+``cloudinary_img`` is for images that scale with the layout: it emits a
+width-descriptor srcset and the given ``sizes``. ``cloudinary_fixed_img``
+is for images with a fixed CSS width and emits 1x/2x/3x variants. Both
+add ``width``/``height`` when the dimensions are known, so the browser can
+reserve the space before the image arrives, and accept a ``placeholder``
+data URI that is painted behind the image until it loads.
+"""
+
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from wedding import cloudinary_urls
+
+register = template.Library()
+
+
+def _img(attrs, placeholder=None):
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    if placeholder:
+        attrs['style'] = f"background: url({placeholder}) center / cover no-repeat"
+        # Transparent images would otherwise keep showing it
+        attrs['onload'] = "this.style.background='none'"
+    return format_html('<img{}>', flatatt({
+        name.replace('_', '-'): value for name, value in attrs.items() if value is not None
+    }))
+
+
+@register.simple_tag
+def cloudinary_base(resource_type='image'):
+    return cloudinary_urls.delivery_base(resource_type)
+
+
+@register.simple_tag
+def cloudinary_url(public_id, width=None, transformation=cloudinary_urls.DEFAULT_TRANSFORMATION, resource_type='image'):
+    return cloudinary_urls.cloudinary_url(str(public_id), width, None, transformation, resource_type)
+
+
+@register.simple_tag
+def cloudinary_img(public_id, max_width=1200, sizes='100vw', width=None, height=None, placeholder=None, **attrs):
+    """Fluid <img>; ``width``/``height`` are the original's dimensions, if known."""
+    if not public_id:
+        return ''
+    public_id = str(public_id)
+    attrs['width'], attrs['height'] = cloudinary_urls.scaled_size(width, height, max_width)
+    attrs['src'] = cloudinary_urls.cloudinary_url(public_id, min(max_width, width or max_width))
+    attrs['srcset'] = cloudinary_urls.srcset(public_id, max_width, width)
+    attrs['sizes'] = sizes
+    return _img(attrs, placeholder)
+
+
+@register.simple_tag
+def cloudinary_fixed_img(public_id, width, height=None, **attrs):
+    """<img> rendered ``width`` CSS pixels wide, with a variant per device pixel ratio."""
+    if not public_id:
+        return ''
+    public_id = str(public_id)
+    attrs['src'] = cloudinary_urls.cloudinary_url(public_id, width)
+    attrs['srcset'] = cloudinary_urls.dpr_srcset(public_id, width)
+    attrs['width'], attrs['height'] = width, height
+    return _img(attrs)
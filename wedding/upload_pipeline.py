@@ -0,0 +1,351 @@
+"""
+Compress-and-upload pipeline for the Cloudinary scripts.
+
+Pillow work (resize, encode, placeholder) runs in a process pool and the
+uploads in a small thread pool, so the two overlap instead of taking
+turns. At most ``max_pending`` compressed files are held in memory at a
+time, and JPEGs are downscaled while decoding, so a worker never holds a
+full-resolution camera original. Each file's peak RSS is reported so the
+worker count can be sized to the container.
+
+Each manifest entry records a hash of the source file and the settings
+it was compressed with, so ``plan_sync()`` can tell new and changed files
+from ones that are already up to date, and spot manifest entries whose
+file is gone. Finished uploads are written to the manifest straight
+away, so an interrupted run picks up where it stopped.
+
+The uploader is any object with ``upload(buffer, folder, public_id)``
+returning Cloudinary's result dict, and ``destroy(public_id)``;
+``CloudinaryUploader`` is the real one.
+"""
+
+import hashlib
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from io import BytesIO
+
+from PIL import Image, features
+
+from .placeholders import make_placeholder
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+# Bump when compress() changes output, to re-upload everything on the next sync
+COMPRESSION_VERSION = 2
+# Pillow format name and whether it can keep an alpha channel
+OUTPUT_FORMATS = {'jpeg': ('JPEG', False), 'webp': ('WEBP', True), 'avif': ('AVIF', True)}
+# Floor for the size-targeted quality search
+MIN_QUALITY = 55
+
+UploadJob = namedtuple(
+    'UploadJob', 'key path folder public_id max_width quality source_hash target_kb output_format',
+    defaults=(None, 'jpeg'),
+)
+Compressed = namedtuple('Compressed', 'job data format original_size placeholder peak_rss')
+UploadResult = namedtuple('UploadResult', 'job entry original_size compressed_size error peak_rss', defaults=(None,))
+SyncPlan = namedtuple('SyncPlan', 'new changed unchanged orphans')
+
+
+def check_output_format(output_format):
+    """Raise ValueError if this Pillow build can't write ``output_format``."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}")
+    if output_format != 'jpeg' and not features.check(output_format):
+        raise ValueError(f"This Pillow build has no {output_format.upper()} support")
+
+
+def content_hash(path, max_width, quality, target_kb=None, output_format='jpeg'):
+    """sha256 of the file's bytes and the settings it will be compressed with."""
+    settings = f"v{COMPRESSION_VERSION}:{max_width}:{quality}:{target_kb}:{output_format}:"
+    digest = hashlib.sha256(settings.encode())
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_jobs(static_root, local_dir, cloud_folder, max_width, quality, target_kb=None, output_format='jpeg'):
+    """An UploadJob per image file in ``static_root/local_dir``, sorted by name."""
+    full_path = os.path.join(static_root, local_dir)
+    if not os.path.isdir(full_path):
+        return []
+    return [
+        UploadJob(
+            f"{local_dir}/{name}", os.path.join(full_path, name), cloud_folder,
+            # Cloudinary public_ids can't contain '&'
+            os.path.splitext(name)[0].replace('&', '_and_'), max_width, quality,
+            content_hash(os.path.join(full_path, name), max_width, quality, target_kb, output_format),
+            target_kb, output_format,
+        )
+        for name in sorted(os.listdir(full_path))
+        if not name.startswith('.')
+        and os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+        and os.path.isfile(os.path.join(full_path, name))
+    ]
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak-RSS counter for this process (Linux only)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _peak_rss():
+    """Peak RSS in bytes since the last reset, or for the process's lifetime."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _open_scaled(path, max_width):
+    """Open ``path`` no wider than ``max_width``, decoding JPEGs at reduced scale."""
+    img = Image.open(path)
+    if not max_width or img.width <= max_width:
+        # load() reads the pixels and closes the file itself
+        img.load()
+        return img
+    with img:
+        target = (max_width, round(img.height * max_width / img.width))
+        # JPEG: decode straight to the smallest 1/2, 1/4 or 1/8 scale that is still >= target
+        img.draft('RGB', target)
+        # reducing_gap lets Pillow reduce() by a whole factor before the LANCZOS pass
+        return img.resize(target, Image.LANCZOS, reducing_gap=3.0)
+
+
+def _encode(img, fmt, quality):
+    buffer = BytesIO()
+    if fmt == 'PNG':
+        img.save(buffer, format='PNG', optimize=True)
+    elif fmt == 'JPEG':
+        img.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        img.save(buffer, format=fmt, quality=quality)
+    return buffer
+
+
+def _encode_to_size(img, fmt, max_quality, target_bytes):
+    """Encode at the highest quality in MIN_QUALITY..max_quality that fits target_bytes."""
+    low, high = MIN_QUALITY, max_quality
+    best = None
+    while low <= high:
+        quality = (low + high) // 2
+        buffer = _encode(img, fmt, quality)
+        if buffer.getbuffer().nbytes <= target_bytes:
+            best, low = buffer, quality + 1
+        else:
+            high = quality - 1
+    # Nothing fits: settle for the floor rather than fail the upload
+    return best or _encode(img, fmt, MIN_QUALITY)
+
+
+def compress(job):
+    """Resize and re-encode one image. Runs in a worker process."""
+    _reset_peak_rss()
+    img = _open_scaled(job.path, job.max_width)
+    has_transparency = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+    placeholder = make_placeholder(img)
+
+    fmt, keeps_alpha = OUTPUT_FORMATS[job.output_format]
+    if has_transparency and not keeps_alpha:
+        # Keep PNG for transparent images when the output format can't hold alpha
+        fmt = 'PNG'
+    elif not has_transparency and img.mode != 'RGB':
+        img = img.convert('RGB')
+    elif has_transparency and img.mode != 'RGBA':
+        img = img.convert('RGBA')
+
+    if job.target_kb and fmt != 'PNG':
+        buffer = _encode_to_size(img, fmt, job.quality, job.target_kb * 1024)
+    else:
+        buffer = _encode(img, fmt, job.quality)
+    img.close()
+    data = buffer.getvalue()
+    buffer.close()
+    return Compressed(job, data, fmt.lower(), os.path.getsize(job.path), placeholder, _peak_rss())
+
+
+class CloudinaryUploader:
+    def upload(self, buffer, folder, public_id):
+        import cloudinary.uploader
+
+        return cloudinary.uploader.upload(
+            buffer, folder=folder, public_id=public_id, overwrite=True, resource_type='image',
+        )
+
+    def destroy(self, public_id):
+        import cloudinary.uploader
+
+        return cloudinary.uploader.destroy(public_id, resource_type='image', invalidate=True)
+
+
+class ManifestCheckpoint:
+    """The manifest file, rewritten atomically after every recorded upload."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def record(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self._write()
+
+    def remove(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+            self._write()
+
+    def _write(self):
+        # Write-then-rename, so a crash mid-write never truncates the manifest
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def with_retries(func, retries=3, backoff=1.0, sleep=time.sleep):
+    """Call ``func()``, retrying failures after backoff, 2 * backoff, 4 * backoff... seconds."""
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except Exception:
+            if attempt == retries:
+                raise
+            sleep(backoff * 2 ** attempt)
+
+
+def _upload(compressed, uploader, retries, backoff):
+    job = compressed.job
+    try:
+        result = with_retries(
+            lambda: uploader.upload(BytesIO(compressed.data), job.folder, job.public_id),
+            retries, backoff,
+        )
+    except Exception as exc:
+        return UploadResult(job, None, compressed.original_size, len(compressed.data), exc, compressed.peak_rss)
+    entry = {
+        'public_id': result['public_id'],
+        'url': result['secure_url'],
+        'format': result['format'],
+        'width': result['width'],
+        'height': result['height'],
+        'bytes': result['bytes'],
+        'placeholder': compressed.placeholder,
+        'source_hash': job.source_hash,
+    }
+    return UploadResult(job, entry, compressed.original_size, len(compressed.data), None, compressed.peak_rss)
+
+
+def plan_sync(jobs, checkpoint, local_dirs, force=False):
+    """
+    Sort ``jobs`` into new, changed and unchanged against the manifest.
+
+    ``orphans`` are the manifest keys under ``local_dirs`` with no file
+    any more. Entries from before hashing was added count as changed.
+    """
+    new, changed, unchanged = [], [], []
+    for job in jobs:
+        entry = checkpoint.entries.get(job.key)
+        if entry is None:
+            new.append(job)
+        elif force or entry.get('source_hash') != job.source_hash:
+            changed.append(job)
+        else:
+            unchanged.append(job)
+    job_keys = {job.key for job in jobs}
+    prefixes = tuple(f"{local_dir}/" for local_dir in local_dirs)
+    orphans = sorted(key for key in checkpoint.entries if key.startswith(prefixes) and key not in job_keys)
+    return SyncPlan(new, changed, unchanged, orphans)
+
+
+def delete_orphans(keys, uploader, checkpoint, retries=3, backoff=1.0):
+    """Destroy each orphan's remote copy and drop it from the manifest; yields (key, error)."""
+    for key in keys:
+        public_id = checkpoint.entries[key]['public_id']
+        try:
+            with_retries(lambda: uploader.destroy(public_id), retries, backoff)
+        except Exception as exc:
+            yield key, exc
+            continue
+        checkpoint.remove(key)
+        yield key, None
+
+
+def run(jobs, uploader, checkpoint, processes=None, threads=4, max_pending=8, retries=3, backoff=1.0):
+    """
+    Compress and upload ``jobs``, recording each success in ``checkpoint``.
+
+    Yields an UploadResult per job as it finishes (``error`` is set on
+    failure). ``processes=0`` compresses in this process, which is handy
+    for tests.
+    """
+    compress_pool = ProcessPoolExecutor(processes) if processes != 0 else None
+    upload_pool = ThreadPoolExecutor(threads)
+    in_flight = set()
+
+    def start_upload(compressed):
+        in_flight.add(upload_pool.submit(_upload, compressed, uploader, retries, backoff))
+
+    def finished(futures):
+        for future in futures:
+            result = future.result()
+            if result.error is None:
+                checkpoint.record(result.job.key, result.entry)
+            yield result
+
+    try:
+        compressing = {}
+        job_iter = iter(jobs)
+        while True:
+            # Keep the process pool fed without holding more than max_pending files
+            while len(compressing) + len(in_flight) < max_pending:
+                job = next(job_iter, None)
+                if job is None:
+                    break
+                if compress_pool is None:
+                    start_upload(compress(job))
+                else:
+                    compressing[compress_pool.submit(compress, job)] = job
+            if not compressing and not in_flight:
+                break
+
+            done, _ = wait(set(compressing) | in_flight, return_when=FIRST_COMPLETED)
+            for future in done & set(compressing):
+                job = compressing.pop(future)
+                try:
+                    start_upload(future.result())
+                except Exception as exc:
+                    yield UploadResult(job, None, 0, 0, exc)
+            uploaded = done & in_flight
+            in_flight.difference_update(uploaded)
+            yield from finished(uploaded)
+    finally:
+        upload_pool.shutdown(wait=True, cancel_futures=True)
+        if compress_pool is not None:
+            compress_pool.shutdown(wait=True, cancel_futures=True)
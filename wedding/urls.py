@@ -1,19 +1,40 @@
 from django.urls import path, include
-from . import views
-from .views import StoryEntryViewSet
+from django.views.decorators.csrf import csrf_exempt
+from . import async_views, views
 from django.conf import settings
 from django.conf.urls.static import static
 
 app_name = 'wedding'
 
+
+def story_api(actions):
+    """StoryEntryViewSet view for ``actions``, importing DRF on its first request."""
+    view = None
+
+    @csrf_exempt
+    def dispatch(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            from .api import StoryEntryViewSet
+            view = StoryEntryViewSet.as_view(actions)
+        return view(request, *args, **kwargs)
+    return dispatch
+
+
+# Under ASGI the read-only pages and the story list are async (see wedding/async_views.py)
+pages = async_views if settings.ASYNC_VIEWS else views
+story_entries = async_views.story_entries if settings.ASYNC_VIEWS else story_api({'get': 'list'})
+
 urlpatterns = [
-    path('', views.home, name='home'),
-    path('our-story/', views.our_story, name='our_story'),
-    path('itinerary/', views.itinerary, name='itinerary'),
-    path('honeymoon-fund/', views.honeymoon_fund, name='honeymoon_fund'),
-    path('gallery/', views.gallery, name='gallery'),
-    path('downtown_westminster/', views.downtown_westminster, name='downtown_westminster'),
-    path('faq/', views.faq, name='faq'),
-    path('story-entries/', StoryEntryViewSet.as_view({'get': 'list'}), name='story_entries'),
-    path('story-entries/<int:pk>/', StoryEntryViewSet.as_view({'get': 'retrieve'}), name='story_entry_detail'),
+    path('', pages.home, name='home'),
+    path('our-story/', pages.our_story, name='our_story'),
+    path('itinerary/', pages.itinerary, name='itinerary'),
+    path('honeymoon-fund/', pages.honeymoon_fund, name='honeymoon_fund'),
+    path('gallery/', pages.gallery, name='gallery'),
+    path('gallery/<slug:slug>/photos/', views.gallery_photos, name='gallery_photos'),
+    path('downtown_westminster/', pages.downtown_westminster, name='downtown_westminster'),
+    path('faq/', pages.faq, name='faq'),
+    path('stats/db/', views.db_stats, name='db_stats'),
+    path('story-entries/', story_entries, name='story_entries'),
+    path('story-entries/<int:pk>/', story_api({'get': 'retrieve'}), name='story_entry_detail'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -1,74 +1,92 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import render
-from rest_framework import viewsets
-from .models import StoryEntry
-from .serializers import StoryEntrySerializer
-class StoryEntryViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = StoryEntry.objects.all()
-    serializer_class = StoryEntrySerializer
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.cache import never_cache
+from .db_stats import connection_stats
+from .gallery import get_gallery
+from .page_cache import cached_page
+from .story_cache import get_timeline_html
 
+@cached_page
 def home(request):
     return render(request, 'wedding/home.html')
 
 def our_story(request):
-    entries = StoryEntry.objects.all().order_by('date')
     return render(request, 'wedding/our_story.html', {
-        'story_entries': entries
+        'timeline_html': get_timeline_html(),
     })
 
+@cached_page
 def itinerary(request):
     return render(request, 'wedding/itinerary.html')
 
-def gallery(request):
+def _photo_json(photo):
+    return {'id': photo.id, 'w': photo.width, 'h': photo.height, 'p': photo.placeholder}
+
+def gallery_context():
+    page_size = settings.GALLERY_PAGE_SIZE
     albums = [
         {
-            'slug': 'denver-botanic-gardens',
-            'name': 'Denver Botanic Gardens',
-            'photos': [
-                'Kelly_and_John-4', 'Kelly_and_John-5', 'Kelly_and_John-11',
-                'Kelly_and_John-13', 'Kelly_and_John-17', 'Kelly_and_John-22',
-                'Kelly_and_John-23', 'Kelly_and_John-30', 'Kelly_and_John-31',
-                'Kelly_and_John-41', 'Kelly_and_John-44', 'Kelly_and_John-47',
-                'Kelly_and_John-55', 'Kelly_and_John-59', 'Kelly_and_John-62',
-                'Kelly_and_John-63', 'Kelly_and_John-67', 'Kelly_and_John-76',
-                'Kelly_and_John-81', 'Kelly_and_John-82', 'Kelly_and_John-85',
-                'Kelly_and_John-87', 'Kelly_and_John-89', 'Kelly_and_John-94',
-                'Kelly_and_John-99', 'Kelly_and_John-102', 'Kelly_and_John-106',
-                'Kelly_and_John-112', 'Kelly_and_John-115', 'Kelly_and_John-125',
-                'Kelly_and_John-126', 'Kelly_and_John-143', 'Kelly_and_John-146',
-                'Kelly_and_John-150', 'Kelly_and_John-152', 'Kelly_and_John-154',
-                'Kelly_and_John-162', 'Kelly_and_John-167', 'Kelly_and_John-169',
-                'Kelly_and_John-174', 'Kelly_and_John-179', 'Kelly_and_John-182',
-            ],
-        },
-        {
-            'slug': 'telluride',
-            'name': 'Telluride',
-            'photos': [
-                'K_and_J_1', 'K_and_J_2', 'K_and_J_3', 'K_and_J_4', 'K_and_J_5',
-                'K_and_J_6', 'K_and_J_7', 'K_and_J_8', 'K_and_J_9', 'K_and_J_10',
-                'K_and_J_11', 'K_and_J_12', 'K_and_J_13', 'K_and_J_14', 'K_and_J_15',
-                'K_and_J_16', 'K_and_J_17', 'K_and_J_18', 'K_and_J_19', 'K_and_J_20',
-                'K_and_J_21', 'K_and_J_22', 'K_and_J_23', 'K_and_J_24', 'K_and_J_25',
-                'K_and_J_26', 'K_and_J_27', 'K_and_J_28', 'K_and_J_29', 'K_and_J_30',
-                'K_and_J_31', 'K_and_J_32', 'K_and_J_33', 'K_and_J_34', 'K_and_J_35',
-                'K_and_J_36', 'K_and_J_37', 'K_and_J_38', 'K_and_J_39', 'K_and_J_40',
-                'K_and_J_41', 'K_and_J_42',
-            ],
-        },
-        {
-            'slug': 'wedding',
-            'name': 'Wedding',
-            'photos': [],
-        },
+            'slug': album.slug,
+            'name': album.name,
+            'total': len(album.photos),
+            'photos': [_photo_json(photo) for photo in album.photos[:page_size]],
+        }
+        for album in get_gallery().albums
+        if album.photos
     ]
-    return render(request, 'wedding/gallery.html', {'albums': albums})
+    return {
+        'albums': albums,
+        'page_size': page_size,
+        'breakpoints': settings.CLOUDINARY_BREAKPOINTS,
+    }
+
+def gallery(request):
+    return render(request, 'wedding/gallery.html', gallery_context())
+
+def gallery_photos(request, slug):
+    """One page of an album as JSON: ``?offset=&limit=`` (limit capped at 100)."""
+    gallery = get_gallery()
+    if slug not in gallery.by_slug:
+        raise Http404("No such album")
+    try:
+        offset = max(int(request.GET.get('offset', 0)), 0)
+        limit = min(max(int(request.GET.get('limit', settings.GALLERY_PAGE_SIZE)), 1), 100)
+    except ValueError:
+        return HttpResponseBadRequest("offset and limit must be integers")
+
+    etag = quote_etag(hashlib.sha256(f"{gallery.version}|{slug}|{offset}|{limit}".encode()).hexdigest()[:32])
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        total = len(gallery.by_slug[slug].photos)
+        response = JsonResponse({
+            'total': total,
+            'next': offset + limit if offset + limit < total else None,
+            'photos': [_photo_json(photo) for photo in gallery.page(slug, offset, limit)],
+        })
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.PAGE_CACHE_MAX_AGE)
+    return response
 
+@cached_page
 def honeymoon_fund(request):
     return render(request, 'wedding/honeymoon_fund.html')
 
+@cached_page
 def downtown_westminster(request):
     return render(request, 'wedding/downtown_westminster.html')
 
+@cached_page
 def faq(request):
     return render(request, 'wedding/faq.html')
 
+@never_cache
+@staff_member_required
+def db_stats(request):
+    """Database connection metrics for the worker process that served this request."""
+    return JsonResponse(connection_stats())
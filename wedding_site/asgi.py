@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wedding_site.settings')
+# Serve the async versions of the read-only pages (wedding/async_views.py)
+os.environ.setdefault('ASYNC_VIEWS', 'True')
+# Persistent connections don't survive ASGI's per-request threads; use DB_POOL
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -0,0 +1,40 @@
+"""
+The ``DATABASES['default']`` entry, built from ``DATABASE_URL``.
+
+Without persistence every request opens a new connection, which for
+Railway Postgres means a TCP and TLS handshake before the first query.
+Postgres gets one of two modes:
+
+- persistent (the default): each worker thread keeps its connection for
+  ``conn_max_age`` seconds, checked before reuse after an error
+- pooled: psycopg's connection pool, shared by the threads of a process.
+  A request checks a connection out and returns it when it finishes, so
+  ``pool_max_size`` connections serve any number of threads. Health
+  checks happen on checkout.
+
+SQLite (local development and tests) opens a file, which costs next to
+nothing, so it keeps Django's defaults.
+"""
+
+import dj_database_url
+
+POSTGRES_ENGINE = 'django.db.backends.postgresql'
+
+
+def database_config(url, conn_max_age=600, pool=False, pool_min_size=1, pool_max_size=4, pool_timeout=10.0):
+    database = dj_database_url.parse(url)
+    if database['ENGINE'] != POSTGRES_ENGINE:
+        return database
+    database['CONN_HEALTH_CHECKS'] = True
+    if pool:
+        # Django refuses a pool together with persistent connections
+        database['CONN_MAX_AGE'] = 0
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': pool_min_size,
+            'max_size': pool_max_size,
+            # Seconds a request waits for a free connection before failing
+            'timeout': pool_timeout,
+        }
+    else:
+        database['CONN_MAX_AGE'] = conn_max_age
+    return database
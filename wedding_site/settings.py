@@ -12,9 +12,10 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from decouple import config
-import dj_database_url
-import cloudinary
+
+from .database import database_config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -57,18 +58,22 @@ INSTALLED_APPS = [
     'cloudinary',
     'ckeditor',
     'wedding',
+    'rsvp',
     'rest_framework',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise, able to run natively under ASGI too
+    'wedding.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Last, so the headers above still apply; short-circuits before any view
+    'wedding.prerender.PrerenderedPageMiddleware',
 ]
 
 ROOT_URLCONF = 'wedding_site.urls'
@@ -89,17 +94,64 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'wedding_site.wsgi.application'
+ASGI_APPLICATION = 'wedding_site.asgi.application'
+# Route the read-only wedding pages to their async versions
+# (wedding/async_views.py); wedding_site/asgi.py turns this on
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-# Database configuration
+# Database configuration. Postgres connections persist across requests
+# (DB_CONN_MAX_AGE seconds), or with DB_POOL=True come from a psycopg
+# connection pool per process; see wedding_site/database.py
 DATABASE_URL = config('DATABASE_URL', default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}")
 DATABASES = {
-    'default': dj_database_url.parse(DATABASE_URL)
+    'default': database_config(
+        DATABASE_URL,
+        conn_max_age=config('DB_CONN_MAX_AGE', default=600, cast=int),
+        pool=config('DB_POOL', default=False, cast=bool),
+        pool_min_size=config('DB_POOL_MIN_SIZE', default=1, cast=int),
+        # One per gthread thread (GUNICORN_THREADS) is enough
+        pool_max_size=config('DB_POOL_MAX_SIZE', default=4, cast=int),
+        pool_timeout=config('DB_POOL_TIMEOUT', default=10.0, cast=float),
+    )
+}
+
+# run_migration.py remembers the last schema it verified here, so a
+# restarted container can skip straight to serving (see wedding/boot.py)
+BOOT_STATE_PATH = config('BOOT_STATE_PATH', default=os.path.join(tempfile.gettempdir(), 'wedding-boot-state.json'))
+
+
+# Caching
+# The page cache is file-based so every gunicorn worker shares one copy
+# of each rendered page without needing Redis.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('PAGE_CACHE_DIR', default=os.path.join(tempfile.gettempdir(), 'wedding-site-pages')),
+    },
 }
 
+# Identifies the running release; part of every page cache key
+DEPLOY_VERSION = config('DEPLOY_VERSION', default=config('RAILWAY_GIT_COMMIT_SHA', default='dev'))
+
+PAGE_CACHE_ENABLED = config('PAGE_CACHE_ENABLED', default=not DEBUG, cast=bool)
+PAGE_CACHE_ALIAS = 'pages'
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+# How long browsers may reuse a page before revalidating with its ETag
+PAGE_CACHE_MAX_AGE = config('PAGE_CACHE_MAX_AGE', default=300, cast=int)
+# Shared so a signal-driven invalidation in one worker reaches them all
+STORY_CACHE_ALIAS = 'pages'
+# Browsers/consumers may reuse StoryEntry API responses this long before revalidating
+STORY_API_MAX_AGE = config('STORY_API_MAX_AGE', default=60, cast=int)
+# Widest story image the API links to (the srcset starts at CLOUDINARY_BREAKPOINTS)
+STORY_IMAGE_MAX_WIDTH = 1200
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -145,6 +197,29 @@ STATICFILES_DIRS = [
 # WhiteNoise configuration for static files
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Pages rendered to compressed HTML by `manage.py prerender_pages` at deploy
+# time and served from memory by PrerenderedPageMiddleware
+PRERENDERED_PAGES = [
+    'wedding:home',
+    'wedding:itinerary',
+    'wedding:honeymoon_fund',
+    'wedding:downtown_westminster',
+    'wedding:faq',
+]
+PRERENDERED_PAGES_DIR = os.path.join(STATIC_ROOT, 'pages')
+PRERENDERED_PAGES_ENABLED = config('PRERENDERED_PAGES_ENABLED', default=not DEBUG, cast=bool)
+
+# Gallery albums, in tab order, built from the Cloudinary upload manifest
+GALLERY_MANIFEST_PATH = os.path.join(BASE_DIR, 'scripts', 'cloudinary_manifest.json')
+GALLERY_MANIFEST_PREFIX = 'images/gallery/'
+GALLERY_ALBUMS = [
+    ('denver-botanic-gardens', 'Denver Botanic Gardens'),
+    ('telluride', 'Telluride'),
+    ('wedding', 'Wedding'),
+]
+# Photos embedded in the page per album; the rest come from the JSON endpoint
+GALLERY_PAGE_SIZE = 12
+
 # Media files configuration
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -157,13 +232,23 @@ CLOUDINARY_STORAGE = {
 }
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
-# Configure the cloudinary SDK directly (needed by CloudinaryField)
-cloudinary.config(
-    cloud_name=config('CLOUDINARY_CLOUD_NAME'),
-    api_key=config('CLOUDINARY_API_KEY'),
-    api_secret=config('CLOUDINARY_API_SECRET'),
-    secure=True,
-)
+# Cloudinary SDK configuration (needed by CloudinaryField). The SDK reads
+# this itself the first time it is imported, so the settings module doesn't
+# import it.
+CLOUDINARY = {
+    'cloud_name': CLOUDINARY_STORAGE['CLOUD_NAME'],
+    'api_key': CLOUDINARY_STORAGE['API_KEY'],
+    'api_secret': CLOUDINARY_STORAGE['API_SECRET'],
+    'secure': True,
+}
+
+# Responsive image widths for srcset, and pixel ratios for fixed-size images
+CLOUDINARY_BREAKPOINTS = [320, 480, 640, 800, 1024, 1280, 1600]
+CLOUDINARY_DPRS = [1, 2, 3]
+
+# RSVP guest name search: 'memory' (pure-Python trigram index) or 'postgres' (pg_trgm)
+RSVP_GUEST_SEARCH_BACKEND = config('RSVP_GUEST_SEARCH_BACKEND', default='memory')
+RSVP_GUEST_SEARCH_TTL = config('RSVP_GUEST_SEARCH_TTL', default=300, cast=int)
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -188,8 +273,20 @@ if not DEBUG:
     SECURE_BROWSER_XSS_FILTER = True
     X_FRAME_OPTIONS = 'DENY'
 
-# Email configuration (add if needed later)
-# EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+# Email configuration. RSVP confirmations are queued in the database and
+# sent by `manage.py send_rsvp_emails`, never from inside a request.
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=30, cast=int)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='Kelly & John <rsvp@example.com>')
+
+# Outbox worker: messages per SMTP connection, and attempts before giving up
+RSVP_EMAIL_BATCH_SIZE = config('RSVP_EMAIL_BATCH_SIZE', default=50, cast=int)
+RSVP_EMAIL_MAX_ATTEMPTS = config('RSVP_EMAIL_MAX_ATTEMPTS', default=5, cast=int)
 
 # Logging configuration
 LOGGING = {
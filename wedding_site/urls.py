@@ -29,6 +29,7 @@ urlpatterns = [
     path('', redirect_to_home, name='home_redirect'),
     path('admin/', admin.site.urls),
     path('wedding/', include('wedding.urls')),
+    path('rsvp/', include('rsvp.urls')),
 ]
 
 # Serve media files in development